@@ -14,3 +14,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# Loaded once in the gunicorn master with --preload, so everything
+# warmed up here is shared by all workers. gunicorn.conf.py connects
+# each worker to the database after the fork. import_times sets WARMUP=0
+# to measure the imports alone.
+if int(os.environ.get('WARMUP', 1)):
+    from core.warmup import warmup
+
+    warmup()
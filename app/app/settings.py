@@ -51,8 +51,14 @@ INSTALLED_APPS = [
     'user',
     'recipe',
 ]
+# The benchmark commands seed & load test a database, so they are left
+# out of production unless asked for.
+if DEBUG or bool(int(os.environ.get('BENCHMARK', 0))):
+    INSTALLED_APPS.append('benchmark')
 
 MIDDLEWARE = [
+    'core.middleware.HealthCheckMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,10 +66,75 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
+# Opt-in inspection of the queries made by each request, logging those
+# that exceed these budgets or repeat a query more than MAX_REPEATS times.
+QUERY_BUDGET = {
+    'MAX_QUERIES': int(os.environ.get('QUERY_BUDGET_MAX_QUERIES', 20)),
+    'MAX_DB_TIME_MS': int(os.environ.get('QUERY_BUDGET_MAX_DB_TIME_MS', 200)),
+    'MAX_REPEATS': int(os.environ.get('QUERY_BUDGET_MAX_REPEATS', 3)),
+}
+if bool(int(os.environ.get('QUERY_BUDGET_CHECKS', 0))):
+    MIDDLEWARE.append('core.middleware.QueryBudgetMiddleware')
+
+# Requests profiled on demand are written here as pstats files, outside
+# of /vol/web which the proxy serves. Signed X-Profile headers are
+# accepted for PROFILING_SIGNATURE_MAX_AGE seconds.
+PROFILING_DIR = os.environ.get('PROFILING_DIR', '/vol/profiles')
+PROFILING_SIGNATURE_MAX_AGE = 600
+
+# Bearer token the Prometheus scraper sends to /metrics, which is closed
+# while this is empty.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 ROOT_URLCONF = 'app.urls'
 
+# Seconds a /readyz result is reused before the database is checked again.
+READYZ_CACHE_SECONDS = int(os.environ.get('READYZ_CACHE_SECONDS', 5))
+
+# Recipe statistics list this many top tags & ingredients, and are cached
+# until the user changes their recipes or for at most this long.
+RECIPE_STATS_TOP = int(os.environ.get('RECIPE_STATS_TOP', 5))
+RECIPE_STATS_CACHE_SECONDS = int(
+    os.environ.get('RECIPE_STATS_CACHE_SECONDS', 300)
+)
+
+# Similar recipes are ranked by shared tags & ingredients, each counting
+# with its weight.
+SIMILAR_RECIPES_TAG_WEIGHT = float(
+    os.environ.get('SIMILAR_RECIPES_TAG_WEIGHT', 1)
+)
+SIMILAR_RECIPES_INGREDIENT_WEIGHT = float(
+    os.environ.get('SIMILAR_RECIPES_INGREDIENT_WEIGHT', 2)
+)
+# Tags & ingredients on more recipes than this are too common to find
+# candidates by, and only the best candidates are scored.
+SIMILAR_RECIPES_MAX_FEATURE_USES = int(
+    os.environ.get('SIMILAR_RECIPES_MAX_FEATURE_USES', 1000)
+)
+SIMILAR_RECIPES_MAX_CANDIDATES = int(
+    os.environ.get('SIMILAR_RECIPES_MAX_CANDIDATES', 500)
+)
+
+# Responses to requests with an Idempotency-Key are replayed for retries
+# with the same key for this long.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+# Retries of a request still running are refused for at most this long.
+IDEMPOTENCY_LOCK_SECONDS = int(
+    os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 60)
+)
+
+# Most requests a client may send in one call to /api/batch/.
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 10))
+
+# Admin lists of tables with at least this many rows show the estimated
+# row count instead of counting every row.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(
+    os.environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000)
+)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -93,9 +164,76 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Keep connections open between requests for this many seconds,
+        # 0 closes them after every request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Transaction-mode poolers (e.g. PgBouncer) hand out a different
+        # server connection per transaction, which breaks server-side
+        # cursors. psycopg2 does not use prepared statements.
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_POOLER_MODE', 0))
+        ),
     }
 }
 
+# Check a persistent connection still works before a request reuses it.
+DB_CONN_HEALTH_CHECKS = bool(int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1)))
+# A connection which passed the check is trusted for this long.
+DB_CONN_HEALTH_CHECK_SECONDS = int(
+    os.environ.get('DB_CONN_HEALTH_CHECK_SECONDS', 10)
+)
+
+# Read replicas, given as a comma separated list of hosts which share
+# the credentials of the primary.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write.
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+
+# Caching
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Memcached is shared by all workers, the local memory cache is only
+# suitable for a single process.
+
+if os.environ.get('MEMCACHED_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ.get('MEMCACHED_LOCATION'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Artificial latency added to every query, only meant for load testing
+# how the app behaves against a slow database.
+DB_SIMULATED_LATENCY_MS = int(os.environ.get('DB_SIMULATED_LATENCY_MS', 0))
+
+
+# ASGI deployment
+# Read requests on the recipe APIs are served by async views which run
+# the ORM work in a thread pool bounded by ASYNC_READ_THREADS.
+
+ASYNC_READ_VIEWS = bool(int(os.environ.get('ASYNC_READ_VIEWS', 0)))
+ASYNC_READ_THREADS = int(os.environ.get('ASYNC_READ_THREADS', 16))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -139,6 +277,19 @@ MEDIA_URL = '/static/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+# Resized recipe images are generated on demand for these widths only
+# and cached under MEDIA_ROOT, evicting least recently used files once
+# the cache grows past RECIPE_IMAGE_CACHE_MAX_BYTES.
+RECIPE_IMAGE_WIDTHS = [160, 320, 640, 1280]
+RECIPE_IMAGE_CACHE_DIR = 'cache'
+RECIPE_IMAGE_CACHE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+)
+
+# When set, media files are handed to nginx with X-Accel-Redirect under
+# this internal location instead of being streamed by the app.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -148,9 +299,41 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Only trust the address nginx appends to X-Forwarded-For, so clients
+    # cannot pick their own throttle bucket.
+    'NUM_PROXIES': 1,
 }
 
+# Requests allowed per user, or per address when anonymous, for the
+# throttle_scope of a view or '<scope>.<action>' for a single action.
+# Override with e.g. THROTTLE_RATES=token.post=5/min,recipes=600/min
+THROTTLE_RATES = {
+    'recipes': '1200/min',
+    'recipes.create': '120/min',
+    'recipes.update': '240/min',
+    'recipes.partial_update': '240/min',
+    'recipes.destroy': '240/min',
+    'recipes.clone': '60/min',
+    'recipes.upload_image': '20/min',
+    'tags': '1200/min',
+    'ingredients': '1200/min',
+    # Issuing tokens hashes a password, which is slow by design.
+    'token.post': '10/min',
+    'users.post': '20/hour',
+}
+THROTTLE_RATES.update(
+    item.split('=', 1)
+    for item in os.environ.get('THROTTLE_RATES', '').split(',') if item
+)
+# Turned off to benchmark a server, which would otherwise answer most
+# of the requests with 429.
+THROTTLES_ENABLED = bool(int(os.environ.get('THROTTLES_ENABLED', 1)))
+
 # Ths is to enable uploading images through a browsable interface.
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Prebuilt OpenAPI schema (JSON), generated by scripts/run.sh at startup.
+# The schema is generated on first request when this is not set.
+SPECTACULAR_SCHEMA_FILE = os.environ.get('SPECTACULAR_SCHEMA_FILE', '')
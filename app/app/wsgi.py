@@ -14,3 +14,18 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# uWSGI loads this module once in the master before forking workers, so
+# everything warmed up here is shared by all of them. import_times sets
+# WARMUP=0 to measure the imports alone.
+from core.warmup import warmup, warmup_connections  # noqa: E402
+
+if int(os.environ.get('WARMUP', 1)):
+    warmup()
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:  # Not running under uWSGI.
+    pass
+else:
+    postfork(warmup_connections)
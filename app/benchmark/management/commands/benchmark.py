@@ -0,0 +1,135 @@
+"""
+Django command to benchmark the API of a running server
+"""
+import json
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.authtoken.models import Token
+
+from benchmark.runner import Runner
+from benchmark.scenarios import default_scenarios
+from benchmark.seed import Seeder
+from core.models import Recipe, Tag
+
+
+def git_commit():
+    """ Return the checked out commit, if this is a git checkout. """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """ Django command to seed data & benchmark the API """
+    help = (
+        'Seed benchmark data, then drive the recipe & user APIs of a '
+        'running server concurrently and report throughput, latency '
+        'percentiles & queries per request. Run the server with '
+        'THROTTLES_ENABLED=0, requests answered with 429 are reported as '
+        'throttled.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests to send per scenario',
+        )
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes-per-user', type=int, default=100)
+        parser.add_argument('--tags-per-user', type=int, default=20)
+        parser.add_argument('--ingredients-per-user', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--token',
+            help='Benchmark as the owner of this token, without seeding',
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Only run the named scenario, may be repeated',
+        )
+        parser.add_argument(
+            '--metrics-token', default=settings.METRICS_TOKEN,
+            help='Bearer token for /metrics, defaults to METRICS_TOKEN',
+        )
+        parser.add_argument('--output', help='Write results as JSON here')
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        if options['token']:
+            try:
+                token = Token.objects.get(key=options['token'])
+            except Token.DoesNotExist:
+                raise CommandError('Unknown token')
+            user_id, key = token.user_id, token.key
+        else:
+            self.stdout.write('Seeding data ...')
+            user_id, key = Seeder(seed=options['seed']).seed(
+                options['users'],
+                options['recipes_per_user'],
+                options['tags_per_user'],
+                options['ingredients_per_user'],
+            )
+
+        recipe_ids = list(Recipe.objects.filter(
+            user_id=user_id,
+        ).values_list('id', flat=True)[:1000])
+        tag_ids = list(
+            Tag.objects.filter(user_id=user_id).values_list('id', flat=True)
+        )
+        scenarios = default_scenarios(recipe_ids, tag_ids)
+        if options['scenarios']:
+            scenarios = [
+                s for s in scenarios if s.name in options['scenarios']
+            ]
+
+        runner = Runner(
+            options['url'], key, options['concurrency'],
+            metrics_token=options['metrics_token'],
+        )
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = summary = runner.run_scenario(
+                scenario, options['requests'],
+            )
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f'{scenario.name:<22} {summary["throughput_rps"]:>8} rps  '
+                f'p50 {latency["p50"]:>8}ms  p95 {latency["p95"]:>8}ms  '
+                f'p99 {latency["p99"]:>8}ms  '
+                f'queries {summary.get("queries_per_request", "-")}  '
+                f'errors {summary["errors"]}  '
+                f'throttled {summary["throttled"]}'
+            )
+            if summary['throttled']:
+                self.stderr.write(
+                    f'{scenario.name}: {summary["throttled"]} requests were '
+                    'throttled, run the server with THROTTLES_ENABLED=0.'
+                )
+
+        report = {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'config': {
+                key: options[key] for key in [
+                    'url', 'concurrency', 'requests', 'users',
+                    'recipes_per_user', 'tags_per_user',
+                    'ingredients_per_user', 'seed',
+                ]
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
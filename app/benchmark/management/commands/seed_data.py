@@ -0,0 +1,54 @@
+"""
+Django command to seed the database with a large synthetic data set
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from benchmark.seed import BATCH_SIZE, PASSWORD, Seeder
+
+
+class Command(BaseCommand):
+    """ Django command to generate users, tags, ingredients & recipes """
+    help = (
+        'Generate a reproducible synthetic data set, with Zipf distributed '
+        'tag & ingredient popularity, written in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes-per-user', type=int, default=100)
+        parser.add_argument(
+            '--tags', type=int, default=20,
+            help='Tags per user',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=50,
+            help='Ingredients per user',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed, the same seed generates the same data',
+        )
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        start = time.perf_counter()
+        user_id, token = Seeder(
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+        ).seed(
+            options['users'],
+            options['recipes_per_user'],
+            options['tags'],
+            options['ingredients'],
+        )
+        recipes = options['users'] * options['recipes_per_user']
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {options["users"]} users and {recipes} recipes in '
+            f'{time.perf_counter() - start:.1f} seconds'
+        ))
+        self.stdout.write(
+            f'First user id {user_id}, password {PASSWORD!r}, token {token}'
+        )
@@ -0,0 +1,165 @@
+"""
+Drive the API concurrently and measure it
+"""
+import http.client
+import json
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+METRIC_LINE = re.compile(
+    r'^(?P<name>http_request_db_queries_(?:sum|count))'
+    r'\{(?P<labels>[^}]*)\} (?P<value>\S+)$'
+)
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+@dataclass
+class Scenario:
+    """ One kind of request to send repeatedly. """
+    name: str
+    method: str
+    # Route name & method of the request in the app's metrics.
+    route: str
+    path: Callable[[int], str]
+    body: Optional[Callable[[int], dict]] = None
+
+
+def percentile(values, pct):
+    """ Return the pct percentile of sorted values. """
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(latencies, errors, elapsed, throttled=0):
+    """ Return throughput & latency percentiles for a scenario. """
+    latencies = sorted(seconds * 1000 for seconds in latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throttled': throttled,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 2),
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+        },
+    }
+
+
+def parse_query_metrics(text):
+    """ Return {(route, method): [queries, requests]} from /metrics. """
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        labels = dict(LABEL.findall(match['labels']))
+        key = (labels.get('route'), labels.get('method'))
+        index = 0 if match['name'].endswith('_sum') else 1
+        totals[key][index] += float(match['value'])
+
+    return totals
+
+
+class Runner:
+    """ Send scenarios to a running server over keep-alive connections.
+    """
+
+    def __init__(self, base_url, token=None, concurrency=16,
+                 metrics_token=None):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.token = token
+        self.metrics_token = metrics_token
+        self.concurrency = concurrency
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn_class = (
+                http.client.HTTPSConnection if self.scheme == 'https'
+                else http.client.HTTPConnection
+            )
+            conn = self.local.conn = conn_class(self.netloc, timeout=60)
+        return conn
+
+    def request(self, method, path, body=None, auth=True, headers=None):
+        """ Send one request & return (status, body, seconds). """
+        headers = dict(headers or {})
+        if auth and self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        conn = self._connection()
+        start = time.perf_counter()
+        try:
+            conn.request(method, self.prefix + path, body, headers)
+            response = conn.getresponse()
+            content = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            return 0, b'', time.perf_counter() - start
+
+        return response.status, content, time.perf_counter() - start
+
+    def query_metrics(self):
+        """ Return the app's query counters, or None if unavailable. """
+        headers = {}
+        if self.metrics_token:
+            headers['Authorization'] = f'Bearer {self.metrics_token}'
+        status, content, _ = self.request(
+            'GET', '/metrics', auth=False, headers=headers,
+        )
+        if status != 200:
+            return None
+        return parse_query_metrics(content.decode())
+
+    def run_scenario(self, scenario, requests):
+        """ Send requests for scenario & return its summary. """
+        before = self.query_metrics()
+
+        def send(i):
+            body = scenario.body(i) if scenario.body else None
+            status, _, seconds = self.request(
+                scenario.method, scenario.path(i), body,
+            )
+            return status, seconds
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            start = time.perf_counter()
+            results = list(pool.map(send, range(requests)))
+            elapsed = time.perf_counter() - start
+
+        statuses = [status for status, _ in results]
+        summary = summarize(
+            [seconds for _, seconds in results],
+            sum(
+                1 for status in statuses
+                if not 200 <= status < 300 and status != 429
+            ),
+            elapsed,
+            throttled=statuses.count(429),
+        )
+        after = self.query_metrics()
+        if before is not None and after is not None:
+            key = (scenario.route, scenario.method)
+            queries = after[key][0] - before[key][0]
+            served = after[key][1] - before[key][1]
+            if served:
+                summary['queries_per_request'] = round(queries / served, 2)
+
+        return summary
@@ -0,0 +1,54 @@
+"""
+Requests sent by the benchmark
+"""
+from benchmark.runner import Scenario
+
+
+def default_scenarios(recipe_ids, tag_ids):
+    """ Return scenarios covering the recipe & user API endpoints. """
+    def recipe_detail(i):
+        return f'/api/recipe/recipes/{recipe_ids[i % len(recipe_ids)]}/'
+
+    def recipes_by_tags(i):
+        tags = ','.join(str(tag_ids[(i + j) % len(tag_ids)]) for j in range(2))
+        return f'/api/recipe/recipes/?tags={tags}'
+
+    def new_recipe(i):
+        return {
+            'title': f'Benchmark recipe {i}',
+            'time_minutes': 30,
+            'price': '5.50',
+            'tags': [{'name': 'Tag 0'}, {'name': 'Benchmark'}],
+            'ingredients': [{'name': 'Ingredient 0'}],
+        }
+
+    scenarios = [
+        Scenario(
+            'recipe-list', 'GET', 'recipe:recipe-list',
+            lambda i: '/api/recipe/recipes/',
+        ),
+        Scenario(
+            'tag-list', 'GET', 'recipe:tag-list',
+            lambda i: '/api/recipe/tags/',
+        ),
+        Scenario(
+            'ingredient-list', 'GET', 'recipe:ingredient-list',
+            lambda i: '/api/recipe/ingredients/',
+        ),
+        Scenario('user-me', 'GET', 'user:me', lambda i: '/api/user/me/'),
+        Scenario(
+            'recipe-create', 'POST', 'recipe:recipe-list',
+            lambda i: '/api/recipe/recipes/', new_recipe,
+        ),
+    ]
+    if recipe_ids:
+        scenarios.append(Scenario(
+            'recipe-detail', 'GET', 'recipe:recipe-detail', recipe_detail,
+        ))
+    if tag_ids:
+        scenarios.append(Scenario(
+            'recipe-list-by-tags', 'GET', 'recipe:recipe-list',
+            recipes_by_tags,
+        ))
+
+    return scenarios
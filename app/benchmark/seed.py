@@ -0,0 +1,233 @@
+"""
+Seed the database with benchmark data
+"""
+import csv
+import io
+import itertools
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+BATCH_SIZE = 5000
+PASSWORD = 'benchpass123'
+EMAIL_DOMAIN = 'bench.example.com'
+
+# Popularity of the n-th most used tag or ingredient falls off as
+# 1 / n^exponent, so a few are on most recipes and most are rare.
+TAG_ZIPF_EXPONENT = 1.1
+INGREDIENT_ZIPF_EXPONENT = 0.8
+MAX_TAGS_PER_RECIPE = 4
+
+ADJECTIVES = [
+    'Spicy', 'Creamy', 'Crispy', 'Smoky', 'Quick', 'Slow Cooked', 'Roasted',
+    'Grilled', 'Zesty', 'Classic', 'Rustic', 'Sticky', 'Herby', 'Golden',
+]
+DISHES = [
+    'Chicken Curry', 'Beef Stew', 'Lentil Soup', 'Pad Thai', 'Risotto',
+    'Tacos', 'Lasagne', 'Fried Rice', 'Salad', 'Pancakes', 'Noodles',
+    'Chilli', 'Pie', 'Flatbread', 'Dumplings', 'Porridge', 'Burger',
+]
+
+
+def _bulk_create(model, objs, batch_size):
+    """ Insert objs and return their primary keys in order. """
+    model.objects.bulk_create(objs, batch_size=batch_size)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return [obj.pk for obj in objs]
+
+    # Backends that cannot return the new rows get the last ids instead,
+    # which is safe while nothing else writes to the table.
+    pks = model.objects.order_by('-pk').values_list('pk', flat=True)
+    return list(reversed(pks[:len(objs)]))
+
+
+def _zipf_cum_weights(count, exponent):
+    """ Return cumulative Zipf weights for count ranked items. """
+    return list(itertools.accumulate(
+        1 / (rank ** exponent) for rank in range(1, count + 1)
+    ))
+
+
+class Seeder:
+    """ Create users with their tags, ingredients & recipes in batches.
+        On PostgreSQL recipes & their links are written with COPY. """
+
+    def __init__(self, batch_size=BATCH_SIZE, seed=0):
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.use_copy = connection.vendor == 'postgresql'
+        self.tag_links = []
+        self.ingredient_links = []
+
+    def _copy(self, model, fields, rows):
+        """ Write rows to the table of model with COPY. """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(name).column)
+            for name in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f'({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+
+    def _reserve_ids(self, model, count):
+        """ Take count ids from the sequence of model's table, so rows
+            written with COPY can be referenced straight away. """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [model._meta.db_table, model._meta.pk.column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _insert(self, model, fields, rows):
+        """ Insert rows of field values for model. """
+        if self.use_copy:
+            self._copy(model, fields, rows)
+        else:
+            model.objects.bulk_create(
+                [model(**dict(zip(fields, row))) for row in rows],
+                batch_size=self.batch_size,
+            )
+
+    def _flush_links(self, force=False):
+        """ Write the pending M2M rows once a batch is full. """
+        for through, fields, links in [
+            (Recipe.tags.through, ['recipe_id', 'tag_id'], self.tag_links),
+            (
+                Recipe.ingredients.through,
+                ['recipe_id', 'ingredient_id'],
+                self.ingredient_links,
+            ),
+        ]:
+            if links and (force or len(links) >= self.batch_size):
+                self._insert(through, fields, links)
+                links.clear()
+
+    def create_users(self, count):
+        """ Create count users sharing PASSWORD, returning their ids. """
+        # Hashing is deliberately slow, so do it once for every user.
+        password = make_password(PASSWORD)
+        start = get_user_model().objects.count()
+        return _bulk_create(get_user_model(), [
+            get_user_model()(
+                email=f'user{start + i}@{EMAIL_DOMAIN}',
+                name=f'Bench User {start + i}',
+                password=password,
+            )
+            for i in range(count)
+        ], self.batch_size)
+
+    def create_attrs(self, model, user_id, count):
+        """ Create count tags or ingredients for a user. """
+        name = model.__name__
+        return _bulk_create(model, [
+            model(user_id=user_id, name=f'{name} {i}') for i in range(count)
+        ], self.batch_size)
+
+    def recipe_row(self, recipe_id, user_id):
+        """ Return the field values of a random recipe. """
+        return [
+            recipe_id,
+            user_id,
+            f'{self.random.choice(ADJECTIVES)} {self.random.choice(DISHES)}',
+            '',
+            self.random.randint(5, 180),
+            Decimal(self.random.randint(100, 5000)) / 100,
+            '',
+            '',
+        ]
+
+    def create_recipes(self, user_id, count, tag_ids, ingredient_ids):
+        """ Create count recipes for a user & link their tags and
+            ingredients. """
+        fields = [
+            'id', 'user_id', 'title', 'description', 'time_minutes', 'price',
+            'link', 'image_placeholder',
+        ]
+        tag_weights = _zipf_cum_weights(len(tag_ids), TAG_ZIPF_EXPONENT)
+        ingredient_weights = _zipf_cum_weights(
+            len(ingredient_ids), INGREDIENT_ZIPF_EXPONENT,
+        )
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            if self.use_copy:
+                recipe_ids = self._reserve_ids(Recipe, size)
+                self._copy(Recipe, fields, [
+                    self.recipe_row(recipe_id, user_id)
+                    for recipe_id in recipe_ids
+                ])
+            else:
+                recipe_ids = _bulk_create(Recipe, [
+                    Recipe(**dict(zip(fields, self.recipe_row(None, user_id))))
+                    for _ in range(size)
+                ], self.batch_size)
+
+            for recipe_id in recipe_ids:
+                self.link(
+                    recipe_id,
+                    tag_ids, tag_weights,
+                    ingredient_ids, ingredient_weights,
+                )
+            self._flush_links()
+
+    def link(self, recipe_id, tag_ids, tag_weights, ingredient_ids,
+             ingredient_weights):
+        """ Queue the M2M rows for a recipe. """
+        if tag_ids:
+            tags = self.random.choices(
+                tag_ids,
+                cum_weights=tag_weights,
+                k=self.random.randint(0, MAX_TAGS_PER_RECIPE),
+            )
+            self.tag_links.extend(
+                (recipe_id, tag_id) for tag_id in sorted(set(tags))
+            )
+        if ingredient_ids:
+            # Most recipes need a handful of ingredients, a few need many.
+            count = max(1, int(self.random.lognormvariate(1.8, 0.5)))
+            ingredients = self.random.choices(
+                ingredient_ids,
+                cum_weights=ingredient_weights,
+                k=count,
+            )
+            self.ingredient_links.extend(
+                (recipe_id, ingredient_id)
+                for ingredient_id in sorted(set(ingredients))
+            )
+
+    def seed(self, users, recipes_per_user, tags_per_user,
+             ingredients_per_user):
+        """ Seed the data set & return the id & token of the first user.
+        """
+        with transaction.atomic():
+            user_ids = self.create_users(users)
+            for user_id in user_ids:
+                tag_ids = self.create_attrs(Tag, user_id, tags_per_user)
+                ingredient_ids = self.create_attrs(
+                    Ingredient, user_id, ingredients_per_user,
+                )
+                self.create_recipes(
+                    user_id, recipes_per_user, tag_ids, ingredient_ids,
+                )
+            self._flush_links(force=True)
+
+        token, _ = Token.objects.get_or_create(user_id=user_ids[0])
+        return user_ids[0], token.key
@@ -0,0 +1,82 @@
+"""
+Tests for the benchmark runner
+"""
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from benchmark.runner import (
+    Runner,
+    Scenario,
+    parse_query_metrics,
+    percentile,
+    summarize,
+)
+
+
+class RunnerTests(SimpleTestCase):
+    """ Test measuring & reporting results. """
+
+    def test_percentile(self):
+        """ Test picking percentiles from sorted values. """
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 51)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+
+    def test_summarize(self):
+        """ Test summarizing the latencies of a scenario. """
+        summary = summarize([0.01, 0.02, 0.03, 0.04], errors=1, elapsed=2)
+
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['throughput_rps'], 2.0)
+        self.assertEqual(summary['latency_ms']['p50'], 30.0)
+
+    def test_parse_query_metrics(self):
+        """ Test reading query counters from the metrics endpoint. """
+        text = (
+            '# TYPE http_request_db_queries histogram\n'
+            'http_request_db_queries_bucket{le="1.0",method="GET",'
+            'route="recipe:recipe-list"} 0.0\n'
+            'http_request_db_queries_count{method="GET",'
+            'route="recipe:recipe-list"} 10.0\n'
+            'http_request_db_queries_sum{method="GET",'
+            'route="recipe:recipe-list"} 40.0\n'
+        )
+
+        totals = parse_query_metrics(text)
+
+        self.assertEqual(totals[('recipe:recipe-list', 'GET')], [40.0, 10.0])
+
+    def test_query_metrics_sends_token(self):
+        """ Test the metrics are read with the metrics bearer token. """
+        runner = Runner('http://localhost', 'api', metrics_token='scrape')
+
+        with patch.object(
+            runner, 'request', return_value=(200, b'', 0.01),
+        ) as patched_request:
+            runner.query_metrics()
+
+        patched_request.assert_called_once_with(
+            'GET', '/metrics', auth=False,
+            headers={'Authorization': 'Bearer scrape'},
+        )
+
+    def test_throttled_counted_separately(self):
+        """ Test 429 responses are not counted as errors. """
+        runner = Runner('http://localhost', 'api', concurrency=2)
+        scenario = Scenario('list', 'GET', 'list', lambda i: '/')
+        statuses = iter([200, 429, 429, 500])
+
+        def request(method, path, body=None, **kwargs):
+            if path == '/metrics':
+                return 401, b'', 0.01
+            return next(statuses), b'', 0.01
+
+        with patch.object(runner, 'request', side_effect=request):
+            summary = runner.run_scenario(scenario, 4)
+
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['throttled'], 2)
@@ -0,0 +1,99 @@
+"""
+Tests for seeding benchmark data
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from rest_framework.authtoken.models import Token
+
+from benchmark.seed import PASSWORD, Seeder
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+class SeederTests(TestCase):
+    """ Test seeding the database. """
+
+    def test_seed(self):
+        """ Test seeding creates the requested data set. """
+        user_id, key = Seeder(batch_size=7).seed(
+            users=3,
+            recipes_per_user=10,
+            tags_per_user=4,
+            ingredients_per_user=6,
+        )
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertEqual(Tag.objects.filter(user_id=user_id).count(), 4)
+        self.assertEqual(Ingredient.objects.count(), 18)
+        self.assertEqual(Token.objects.get(key=key).user_id, user_id)
+        user = get_user_model().objects.get(id=user_id)
+        self.assertTrue(user.check_password(PASSWORD))
+
+    def test_recipes_linked_to_own_attrs(self):
+        """ Test recipes only use tags & ingredients of their user. """
+        Seeder().seed(2, 5, 3, 3)
+
+        for recipe in Recipe.objects.prefetch_related('ingredients'):
+            self.assertTrue(recipe.ingredients.exists())
+            for ingredient in recipe.ingredients.all():
+                self.assertEqual(ingredient.user_id, recipe.user_id)
+
+    def test_seed_reproducible(self):
+        """ Test the same seed produces the same data. """
+        Seeder(seed=1).seed(1, 5, 3, 3)
+        first = list(Recipe.objects.values_list('time_minutes', 'price'))
+        Recipe.objects.all().delete()
+
+        Seeder(seed=1).seed(1, 5, 3, 3)
+        second = list(Recipe.objects.values_list('time_minutes', 'price'))
+
+        self.assertEqual(first, second)
+
+    def test_tag_popularity_skewed(self):
+        """ Test a few tags are on most recipes & most tags are rare. """
+        user_id, _ = Seeder().seed(1, 300, 10, 10)
+
+        counts = [
+            tag.recipe_set.count()
+            for tag in Tag.objects.filter(user_id=user_id).order_by('id')
+        ]
+        self.assertGreater(counts[0], counts[-1] * 3)
+
+    def test_ingredient_counts_vary(self):
+        """ Test recipes need differing numbers of ingredients. """
+        Seeder().seed(1, 50, 3, 30)
+
+        counts = {
+            recipe.ingredients.count() for recipe in Recipe.objects.all()
+        }
+        self.assertGreater(len(counts), 3)
+
+
+class SeedDataCommandTests(TestCase):
+    """ Test the seed_data command. """
+
+    def test_seed_data(self):
+        """ Test the command creates the requested data set. """
+        out = StringIO()
+        call_command(
+            'seed_data',
+            '--users=2',
+            '--recipes-per-user=4',
+            '--tags=3',
+            '--ingredients=5',
+            '--batch-size=3',
+            stdout=out,
+        )
+
+        self.assertEqual(Recipe.objects.count(), 8)
+        self.assertEqual(Tag.objects.count(), 6)
+        self.assertEqual(Ingredient.objects.count(), 10)
+        self.assertIn('Created 2 users and 8 recipes', out.getvalue())
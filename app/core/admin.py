@@ -1,8 +1,12 @@
 """
 Django Admin Customization
 """
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 # The following import will show an error in IDE
@@ -10,12 +14,59 @@ from django.utils.translation import gettext_lazy as _
 # odule inside a Docker Container which uses a different
 # path settings to get to the "core" module and "models" file.
 from core import models
+from core.purge import soft_delete_user
+
+
+def estimated_count(model, using='default'):
+    """ Return the planner's estimate of the rows in the table of model,
+        or None when the database cannot provide one. """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # Tables which were never analyzed report -1.
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Paginator which uses the estimated row count of a large table
+        instead of a full COUNT(*) when the list is not filtered. """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if (
+                estimate is not None and
+                estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+            ):
+                return estimate
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """ Base admin for tables which grow with the number of users """
+    paginator = EstimatedCountPaginator
+    # Skip the second COUNT(*) of the whole table when searching.
+    show_full_result_count = False
+    ordering = ['-id']
+    raw_id_fields = ['user']
+    list_select_related = ['user']
 
 
 class UserAdmin(BaseUserAdmin):
     """ Define the admin pages for users """
     ordering = ['id']
-    list_display = ['email', 'name']
+    list_display = ['email', 'name', 'deleted_at']
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (
@@ -28,9 +79,9 @@ class UserAdmin(BaseUserAdmin):
                 )
             }
         ),
-        (_('Important dates'), {'fields': ('last_login',)}),
+        (_('Important dates'), {'fields': ('last_login', 'deleted_at')}),
     )
-    readonly_fields = ['last_login']
+    readonly_fields = ['last_login', 'deleted_at']
     add_fieldsets = (
         (None, {
             'classes': ('wide',),
@@ -46,8 +97,51 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_deleted_objects(self, objs, request):
+        """ List only the users on the delete confirmation page, rather
+            than collecting every row of theirs. """
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.opts.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        """ Soft delete the user, their data is purged in the background.
+        """
+        soft_delete_user(obj)
+
+    def delete_queryset(self, request, queryset):
+        """ Soft delete the selected users. """
+        for user in queryset:
+            soft_delete_user(user)
+
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
+
+
+@admin.register(models.Recipe)
+class RecipeAdmin(ScalableModelAdmin):
+    """ Define the admin pages for recipes """
+    list_display = ['title', 'user', 'time_minutes', 'price']
+    # Matches on the raw column, so the trigram index is used.
+    search_fields = ['title__trgm_icontains']
+    # Only the selected tags & ingredients are rendered, the rest are
+    # searched for on demand.
+    autocomplete_fields = ['tags', 'ingredients']
+
+
+@admin.register(models.Tag)
+class TagAdmin(ScalableModelAdmin):
+    """ Define the admin pages for tags """
+    list_display = ['name', 'user']
+    search_fields = ['name__trgm_icontains']
+
+
+@admin.register(models.Ingredient)
+class IngredientAdmin(ScalableModelAdmin):
+    """ Define the admin pages for ingredients """
+    list_display = ['name', 'user']
+    search_fields = ['name__trgm_icontains']
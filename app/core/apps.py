@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models import CharField
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import db, queries
+        from core.lookups import TrigramContains
+
+        CharField.register_lookup(TrigramContains)
+
+        # Runs after Django has closed connections past CONN_MAX_AGE, so
+        # only the connections about to be reused get checked.
+        request_started.connect(db.close_unhealthy_connections)
+
+        if settings.DB_SIMULATED_LATENCY_MS:
+            connection_created.connect(db.add_latency_wrapper)
+        # Connected last, so recorded durations include simulated latency.
+        connection_created.connect(queries.add_recorders_wrapper)
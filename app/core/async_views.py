@@ -0,0 +1,103 @@
+"""
+Async wrappers for serving read requests under ASGI
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from core.db import close_unhealthy_connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_executor = None
+
+# Profiler of the current request, set by ProfilingMiddleware under
+# ASGI. cProfile only sees the thread it is enabled on, so it is enabled
+# around the view on whichever thread runs it.
+request_profiler = contextvars.ContextVar('request_profiler', default=None)
+
+
+def get_executor():
+    """ Return the bounded thread pool shared by all read views. """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_THREADS,
+            thread_name_prefix='async-read',
+        )
+
+    return _executor
+
+
+def _call_view(view, request, *args, **kwargs):
+    """ Call view, under the request's profiler if it has one. """
+    profiler = request_profiler.get()
+    if profiler is None:
+        return view(request, *args, **kwargs)
+
+    profiler.enable()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        profiler.disable()
+
+
+def _run_read(view, request, *args, **kwargs):
+    """ Run a sync view and render its response in a pool thread. """
+    # Pool threads outlive requests, so they have to look after their
+    # own database connections the way the request cycle normally does.
+    close_old_connections()
+    close_unhealthy_connections()
+    try:
+        response = _call_view(view, request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """ Wrap a sync view so safe requests run in the bounded read pool
+        while writes keep going through the regular sync path. """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            loop = asyncio.get_running_loop()
+            # run_in_executor does not carry context variables over to
+            # the pool thread the way sync_to_async does.
+            return await loop.run_in_executor(
+                get_executor(),
+                contextvars.copy_context().run,
+                functools.partial(_run_read, view, request, *args, **kwargs),
+            )
+
+        return await sync_to_async(functools.partial(_call_view, view))(
+            request, *args, **kwargs,
+        )
+
+    # For callers, like batches, which must run the view on their own
+    # thread & database connection.
+    wrapper.sync_view = view
+    return wrapper
+
+
+def async_read_patterns(patterns):
+    """ Return a copy of URL patterns with every view wrapped by
+        async_read_view(). """
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_read_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        for pattern in patterns
+    ]
@@ -0,0 +1,152 @@
+"""
+Run several API requests in one round trip
+"""
+import json
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+from drf_spectacular.utils import extend_schema, inline_serializer
+from rest_framework import serializers, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Only the resource APIs may be batched, never the batch view itself.
+BATCH_PATH_PREFIXES = ('/api/recipe/', '/api/user/')
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    """ Serializer for one request of a batch. """
+    method = serializers.ChoiceField(
+        choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
+    )
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        """ Only allow the paths of the resource APIs. """
+        if not value.startswith(BATCH_PATH_PREFIXES):
+            raise serializers.ValidationError(
+                'Only the recipe and user APIs can be batched.'
+            )
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """ Serializer for a batch of requests. """
+    requests = BatchOperationSerializer(many=True)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        """ Limit the number of requests in a batch. """
+        if not value:
+            raise serializers.ValidationError('No requests to run.')
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests per batch.'
+            )
+        return value
+
+
+def make_request(request, operation):
+    """ Return a request for an operation, authenticated as the user of
+        the batch request. """
+    path, _, query_string = operation['path'].partition('?')
+    body = b''
+    if 'body' in operation:
+        body = json.dumps(operation['body']).encode()
+
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('wsgi.') and key not in [
+            # A key for the batch must not make its requests replay
+            # each other's responses.
+            'CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_IDEMPOTENCY_KEY',
+        ]
+    }
+    environ.update({
+        'REQUEST_METHOD': operation['method'],
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    # DRF uses these instead of authenticating the request again.
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def run_operation(request, operation):
+    """ Run one operation through the URL resolver & return its status
+        and decoded body. """
+    sub_request = make_request(request, operation)
+    try:
+        match = resolve(sub_request.path_info)
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': None}
+
+    # Reads are async views when ASYNC_READ_VIEWS is on. Their pool
+    # threads use other database connections, which would not see the
+    # writes of an atomic batch, so the view is called on this thread.
+    view = getattr(match.func, 'sync_view', match.func)
+    response = view(sub_request, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+
+    body = None
+    if not response.streaming and response.content and response.get(
+        'Content-Type', ''
+    ).startswith('application/json'):
+        body = json.loads(response.content)
+    return {'status': response.status_code, 'body': body}
+
+
+class BatchView(APIView):
+    """ Run up to BATCH_MAX_REQUESTS recipe & user API requests in one
+        round trip, authenticated once, optionally in one transaction. """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=BatchSerializer,
+        responses=inline_serializer('BatchResponse', {
+            'responses': inline_serializer('BatchOperationResponse', {
+                'status': serializers.IntegerField(),
+                'body': serializers.JSONField(allow_null=True),
+            }, many=True),
+        }),
+    )
+    def post(self, request):
+        """ Run the requests in order & return all their responses. A
+            failed request of an atomic batch stops the batch and rolls
+            back the requests before it. """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['requests']
+
+        if not serializer.validated_data['atomic']:
+            return Response({'responses': [
+                run_operation(request, operation) for operation in operations
+            ]})
+
+        responses = []
+        with transaction.atomic():
+            for operation in operations:
+                responses.append(run_operation(request, operation))
+                if responses[-1]['status'] >= 400:
+                    transaction.set_rollback(True)
+                    return Response(
+                        {'responses': responses},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+        return Response({'responses': responses})
@@ -0,0 +1,95 @@
+"""
+Database connection helpers
+"""
+import time
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import connections, migrations
+from django.db.migrations.executor import MigrationExecutor
+
+
+def close_unhealthy_connections(**kwargs):
+    """ Close persistent connections which no longer respond so the next
+        query reconnects instead of failing. Each connection is checked
+        at most once every DB_CONN_HEALTH_CHECK_SECONDS, so busy workers
+        do not pay a round trip per alias on every request. """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+
+    now = time.monotonic()
+    for conn in connections.all():
+        # Never pull a connection out from under an open transaction.
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        checked_at = getattr(conn, 'health_checked_at', None)
+        if (checked_at is not None
+                and now - checked_at < settings.DB_CONN_HEALTH_CHECK_SECONDS):
+            continue
+        conn.health_checked_at = now
+        if not conn.is_usable():
+            conn.close()
+
+
+class PostgresAddIndexConcurrently(AddIndexConcurrently):
+    """ Build a PostgreSQL only index, such as a trigram index, without
+        locking writes. Other databases skip it. """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    """ Build an index without locking writes on PostgreSQL, and as a
+        plain index on other databases. """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+        else:
+            migrations.AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state,
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state,
+            )
+        else:
+            migrations.AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state,
+            )
+
+
+def unapplied_migrations(connection):
+    """ Return the migrations still to be applied to the database. """
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def simulate_latency(execute, sql, params, many, context):
+    """ Delay each query by DB_SIMULATED_LATENCY_MS. """
+    time.sleep(settings.DB_SIMULATED_LATENCY_MS / 1000)
+    return execute(sql, params, many, context)
+
+
+def add_latency_wrapper(sender, connection, **kwargs):
+    """ Install the latency wrapper on new database connections. """
+    if simulate_latency not in connection.execute_wrappers:
+        connection.execute_wrappers.append(simulate_latency)
@@ -0,0 +1,127 @@
+"""
+Replay the stored response of a retried request
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+# Headers worth replaying along with the stored body.
+REPLAYED_HEADERS = ['Location']
+# Times to try claiming a key which keeps being released under us.
+CLAIM_ATTEMPTS = 3
+
+
+def request_fingerprint(request):
+    """ Return a hash of the method, path & body of a request, with the
+        contents of uploaded files. """
+    digest = hashlib.sha256(f'{request.method} {request.path}'.encode())
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = {
+            name: [value for value in values if not hasattr(value, 'chunks')]
+            for name, values in data.lists()
+        }
+    digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+    for name in sorted(request.FILES):
+        for upload in request.FILES.getlist(name):
+            for chunk in upload.chunks():
+                digest.update(chunk)
+            upload.seek(0)
+    return digest.hexdigest()
+
+
+def idempotency_cache_key(request, key, fingerprint):
+    """ Return the cache key of an idempotency key, scoped by the user,
+        method & path so keys of different users never collide.
+        Anonymous requests are also scoped by their fingerprint, so a
+        guessed key cannot replay someone else's response. """
+    if request.user.is_authenticated:
+        scope = request.user.pk
+    else:
+        scope = f'anon-{fingerprint}'
+    return f'idempotency:{scope}:{request.method}:{request.path}:{key}'
+
+
+def in_progress_response():
+    """ Return the response to a request whose key is claimed. """
+    return Response(
+        {'detail': 'A request with this key is in progress.'},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def idempotent(handler):
+    """ Decorate a view handler to store its first response for an
+        Idempotency-Key and replay it for retries with the same key,
+        without running the handler again. """
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+
+        fingerprint = request_fingerprint(request)
+        cache_key = idempotency_cache_key(request, key, fingerprint)
+        # Claim the key first, so a retry racing the original request
+        # does not run the handler a second time. The claim expires
+        # soon, so a worker dying mid-request does not block the key.
+        for _ in range(CLAIM_ATTEMPTS):
+            if cache.add(
+                cache_key,
+                {'status': None, 'fingerprint': fingerprint},
+                settings.IDEMPOTENCY_LOCK_SECONDS,
+            ):
+                break
+
+            stored = cache.get(cache_key)
+            if stored is None:
+                # Released or expired since the add, so claim it again.
+                continue
+            if stored['status'] is None:
+                return in_progress_response()
+            if stored['fingerprint'] != fingerprint:
+                return Response(
+                    {'detail': 'This key was used for another request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            response = Response(
+                stored['data'],
+                status=stored['status'],
+                headers=stored['headers'],
+            )
+            response[REPLAYED_HEADER] = 'true'
+            return response
+        else:
+            # Never run the handler without holding the claim.
+            return in_progress_response()
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        # Server errors may succeed on a retry, so they are not stored.
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {
+                'status': response.status_code,
+                'fingerprint': fingerprint,
+                'data': response.data,
+                'headers': {
+                    name: response[name]
+                    for name in REPLAYED_HEADERS if response.has_header(name)
+                },
+            }, settings.IDEMPOTENCY_KEY_TTL)
+        return response
+
+    return wrapper
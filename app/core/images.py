@@ -0,0 +1,154 @@
+"""
+Helpers for processing recipe images
+"""
+import base64
+import os
+import uuid
+from io import BytesIO
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+
+# The placeholder is a tiny, heavily compressed copy of the image which
+# clients can stretch & blur while the real image is loading.
+PLACEHOLDER_SIZE = (16, 16)
+PLACEHOLDER_QUALITY = 40
+
+# Running total of the bytes in the rendition cache, shared by workers.
+RENDITION_BYTES_KEY = 'recipe-image-renditions:bytes'
+
+# Renditions are a cache on local disk under MEDIA_ROOT, whatever
+# storage holds the original images: they are written by rename, evicted
+# by modification time & served by the proxy from the local volume. All
+# rendition files go through this storage.
+rendition_storage = FileSystemStorage()
+
+
+def make_placeholder(img):
+    """ Return a low quality image placeholder as a data URI. """
+    thumb = img.convert('RGB')
+    thumb.thumbnail(PLACEHOLDER_SIZE)
+    buffer = BytesIO()
+    thumb.save(buffer, format='JPEG', quality=PLACEHOLDER_QUALITY)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def image_metadata(image_file):
+    """ Compute the stored metadata for an uploaded image file. """
+    image_file.seek(0)
+    with Image.open(image_file) as img:
+        width, height = img.size
+        placeholder = make_placeholder(img)
+    # Leave the file pointer at the start so the file can still be saved.
+    image_file.seek(0)
+
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_size': image_file.size,
+        'image_placeholder': placeholder,
+    }
+
+
+def rendition_path(image, width):
+    """ Return the cache path, relative to MEDIA_ROOT, of a rendition. """
+    return os.path.join(
+        settings.RECIPE_IMAGE_CACHE_DIR,
+        'recipe',
+        str(width),
+        os.path.basename(image.name),
+    )
+
+
+def get_or_create_rendition(image, width):
+    """ Return the relative path of a resized copy of image, creating it
+        on first use. """
+    relative_path = rendition_path(image, width)
+    path = rendition_storage.path(relative_path)
+
+    try:
+        # Bump the modification time on every hit, this is what the
+        # LRU eviction in evict_renditions() orders by.
+        os.utime(path)
+        return relative_path
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a unique temp file & rename into place so concurrent
+    # workers never see (or serve) a partially written rendition.
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with image.open('rb'), Image.open(image) as img:
+        img_format = img.format
+        img.thumbnail((width, img.height))
+        img.save(tmp_path, format=img_format)
+    os.replace(tmp_path, path)
+
+    # Only walk the cache directory when the running total says it is
+    # over budget, or when the total is not known yet.
+    try:
+        total = cache.incr(RENDITION_BYTES_KEY, os.path.getsize(path))
+    except ValueError:
+        total = None
+    if total is None or total > settings.RECIPE_IMAGE_CACHE_MAX_BYTES:
+        total = evict_renditions(
+            settings.RECIPE_IMAGE_CACHE_MAX_BYTES, keep=path,
+        )
+        cache.set(RENDITION_BYTES_KEY, total, None)
+
+    return relative_path
+
+
+def evict_renditions(max_bytes, keep=None):
+    """ Remove the least recently used renditions until the cache
+        holds at most max_bytes, and return the bytes left. The file at
+        keep is never removed. """
+    root = rendition_storage.path(settings.RECIPE_IMAGE_CACHE_DIR)
+    entries = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # Removed by another worker.
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        rendition_storage.delete(path)
+        total -= size
+
+    return total
+
+
+def remove_image(name):
+    """ Remove a stored recipe image & all its renditions, taking these
+        off the running total of the rendition cache. """
+    default_storage.delete(name)
+    removed = 0
+    for width in settings.RECIPE_IMAGE_WIDTHS:
+        relative_path = rendition_path(File(None, name), width)
+        try:
+            size = rendition_storage.size(relative_path)
+        except FileNotFoundError:
+            continue
+        rendition_storage.delete(relative_path)
+        removed += size
+
+    if removed:
+        try:
+            cache.decr(RENDITION_BYTES_KEY, removed)
+        except ValueError:
+            # Not known yet, the next rendition made walks the cache.
+            pass
@@ -0,0 +1,20 @@
+"""
+Custom query lookups
+"""
+from django.db.models import Lookup
+
+
+class TrigramContains(Lookup):
+    """ Case insensitive substring match, as ILIKE on the raw column on
+        PostgreSQL so pg_trgm GIN indexes can serve it. icontains compiles
+        to UPPER(col::text) LIKE ..., which those indexes cannot. """
+    lookup_name = 'trgm_icontains'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        params = lhs_params + [
+            f'%{connection.ops.prep_for_like_query(self.rhs)}%'
+        ]
+        if connection.vendor == 'postgresql':
+            return f'{lhs} ILIKE %s', params
+        return f"UPPER({lhs}) LIKE UPPER(%s) ESCAPE '\\'", params
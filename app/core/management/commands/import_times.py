@@ -0,0 +1,101 @@
+"""
+Django command to report how long the app takes to import
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+# Packages reported separately in the summary, everything else is
+# grouped under its top level package name.
+TRACKED_PACKAGES = [
+    'django',
+    'rest_framework',
+    'drf_spectacular',
+    'PIL',
+    'psycopg2',
+]
+
+IMPORT_TIME_LINE = re.compile(
+    r'^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \| '
+    r'(?P<indent>\s*)(?P<module>\S+)$'
+)
+
+
+def parse_import_times(output):
+    """ Parse `python -X importtime` output into a list of
+        (module, self_us, cumulative_us). """
+    times = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            times.append((
+                match['module'],
+                int(match['self']),
+                int(match['cumulative']),
+            ))
+
+    return times
+
+
+def package_totals(times):
+    """ Sum the self time of modules per top level package. """
+    totals = defaultdict(int)
+    for module, self_us, _ in times:
+        totals[module.split('.')[0]] += self_us
+
+    return totals
+
+
+class Command(BaseCommand):
+    """ Django command to audit import time """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module',
+            default='app.wsgi',
+            help='Entry point to import, defaults to app.wsgi',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Number of slowest modules to list',
+        )
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        # Import in a fresh interpreter, this process has already
+        # imported most of what we want to measure. The entry points
+        # skip their warmup, which is not import time.
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             f'import {options["module"]}'],
+            capture_output=True,
+            text=True,
+            env={**os.environ, 'WARMUP': '0'},
+        )
+        if result.returncode:
+            self.stderr.write(result.stderr)
+            return
+
+        times = parse_import_times(result.stderr)
+        totals = package_totals(times)
+
+        self.stdout.write('Import time per package (ms):')
+        for package in TRACKED_PACKAGES:
+            self.stdout.write(f'  {package:<20} {totals[package] / 1000:8.1f}')
+        self.stdout.write(
+            f'  {"total":<20} {sum(totals.values()) / 1000:8.1f}'
+        )
+
+        self.stdout.write(f'Slowest {options["top"]} modules (self, ms):')
+        slowest = sorted(times, key=lambda t: t[1], reverse=True)
+        for module, self_us, cumulative_us in slowest[:options['top']]:
+            self.stdout.write(
+                f'  {module:<50} {self_us / 1000:8.1f} '
+                f'(cumulative {cumulative_us / 1000:.1f})'
+            )
@@ -0,0 +1,19 @@
+"""
+Django command to create a signed header for profiling a request
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.middleware import sign_profile_request
+
+
+class Command(BaseCommand):
+    """ Django command to print an X-Profile header """
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        self.stdout.write(f'X-Profile: {sign_profile_request()}')
+        self.stdout.write(
+            f'Valid for {settings.PROFILING_SIGNATURE_MAX_AGE} seconds, '
+            f'profiles are written to {settings.PROFILING_DIR}'
+        )
@@ -0,0 +1,40 @@
+"""
+Django command to purge soft deleted recipes & users
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.purge import Purger
+
+
+class Command(BaseCommand):
+    """ Django command to remove soft deleted data in batches """
+    help = (
+        'Delete soft deleted recipes & users with their tags, ingredients '
+        'and image files, in small batches with pauses in between.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Seconds to wait between batches',
+        )
+        parser.add_argument(
+            '--loop', type=float, metavar='SECONDS',
+            help='Keep running, purging again every SECONDS',
+        )
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        purger = Purger(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+        )
+        while True:
+            recipes, users = purger.purge()
+            self.stdout.write(f'Purged {recipes} recipes & {users} users')
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
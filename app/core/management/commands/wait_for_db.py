@@ -1,26 +1,97 @@
 """
 Django command to wait for DB to become available
 """
+import socket
 import time
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.conf import settings
+from django.db import connection
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import unapplied_migrations
+
+# Delays between attempts start small so a database that is almost up
+# costs little, and back off to avoid hammering one that is not.
+INITIAL_DELAY = 0.05
+MAX_DELAY = 2.0
+TCP_TIMEOUT = 1.0
 
 
 class Command(BaseCommand):
     """ Django command to wait for DB """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait before giving up, 0 waits forever',
+        )
+        parser.add_argument(
+            '--migrations',
+            action='store_true',
+            help='Also wait until there are no unapplied migrations',
+        )
+
     def handle(self, *args, **options):
         """ Entrypoint for command """
         self.stdout.write('waiting for database...')
-        db_up = False
-        while db_up is False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second ...')
-                time.sleep(1)
+        timeout = options['timeout']
+        deadline = time.monotonic() + timeout if timeout else None
+        delay = INITIAL_DELAY
+        while not self.database_ready(options['migrations']):
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise CommandError(
+                    f'Database unavailable after {timeout:g} seconds'
+                )
+            self.stdout.write(
+                f'Database unavailable, waiting {delay:.2f} seconds ...'
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_DELAY)
         self.stdout.write(self.style.SUCCESS('Database available'))
+
+    def database_ready(self, migrations):
+        """ Return whether the database accepts queries (and, if asked,
+            has every migration applied). """
+        # A refused TCP connection fails far faster than a full Django
+        # connection attempt & check.
+        if not self.port_open():
+            return False
+        try:
+            self.check(databases=['default'])
+        except (Psycopg2Error, OperationalError):
+            return False
+
+        if migrations and self.pending_migrations():
+            return False
+
+        return True
+
+    def port_open(self):
+        """ Return whether the database host accepts TCP connections. """
+        db_settings = settings.DATABASES['default']
+        host = db_settings.get('HOST')
+        # Nothing to pre-check for local or unix socket connections.
+        if not host or host.startswith('/'):
+            return True
+        try:
+            socket.create_connection(
+                (host, int(db_settings.get('PORT') or 5432)),
+                timeout=TCP_TIMEOUT,
+            ).close()
+        except OSError:
+            return False
+
+        return True
+
+    def pending_migrations(self):
+        """ Return whether any migrations are still to be applied. """
+        plan = unapplied_migrations(connection)
+        if plan:
+            self.stdout.write(f'{len(plan)} migrations pending ...')
+
+        return bool(plan)
@@ -0,0 +1,55 @@
+"""
+Prometheus metrics for the app
+"""
+import os
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by route',
+    ['route', 'method'],
+)
+REQUESTS = Counter(
+    'http_requests_total',
+    'Requests by route and status code',
+    ['route', 'method', 'status'],
+)
+RESPONSE_BYTES = Histogram(
+    'http_response_size_bytes',
+    'Response body size by route',
+    ['route', 'method'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries per request by route',
+    ['route', 'method'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+DB_DURATION = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries per request by route',
+    ['route', 'method'],
+)
+
+
+def render_metrics():
+    """ Return the metrics of all workers in the text exposition format.
+    """
+    # Each uWSGI worker writes its samples to files in this directory,
+    # the collector merges them at scrape time.
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry)
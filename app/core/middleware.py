@@ -0,0 +1,275 @@
+"""
+Middleware for the app
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core import signing
+from django.http import HttpResponse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from core import metrics, views
+from core.async_views import request_profiler
+from core.queries import QueryLog, record_queries
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCapableMiddleware:
+    """ Base for middleware which runs natively on both the sync & the
+        async request path. Under ASGI, Django runs everything below a
+        sync only middleware, the view included, on the single thread it
+        keeps for sync code, so requests would queue behind each other.
+        Subclasses implement call() & acall(). """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Lets Django see the instance as a coroutine function, the
+            # same way its MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def acall(self, request):
+        raise NotImplementedError
+
+
+class HealthCheckMiddleware(AsyncCapableMiddleware):
+    """ Answer load balancer probes before any other middleware runs, so
+        they skip sessions, authentication, CSRF & host validation. """
+    views = {
+        '/healthz': views.healthz,
+        '/readyz': views.readyz,
+        '/metrics': views.metrics,
+    }
+
+    def call(self, request):
+        view = self.views.get(request.path_info)
+        if view is not None:
+            return view(request)
+
+        return self.get_response(request)
+
+    async def acall(self, request):
+        view = self.views.get(request.path_info)
+        if view is not None:
+            return await sync_to_async(view)(request)
+
+        return await self.get_response(request)
+
+
+class QueryRecorder:
+    """ Execute wrapper counting the queries made & time spent on them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """ Record latency, database usage & response size per route. """
+
+    def call(self, request):
+        queries = QueryRecorder()
+        start = time.perf_counter()
+        with record_queries(queries):
+            response = self.get_response(request)
+
+        self.record(request, response, queries, time.perf_counter() - start)
+        return response
+
+    async def acall(self, request):
+        queries = QueryRecorder()
+        start = time.perf_counter()
+        with record_queries(queries):
+            response = await self.get_response(request)
+
+        self.record(request, response, queries, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, queries, duration):
+        """ Observe the metrics of a finished request. """
+        match = request.resolver_match
+        labels = {
+            'route': match.view_name if match else 'unresolved',
+            'method': request.method,
+        }
+        metrics.REQUEST_LATENCY.labels(**labels).observe(duration)
+        metrics.REQUESTS.labels(
+            status=response.status_code,
+            **labels,
+        ).inc()
+        metrics.DB_QUERIES.labels(**labels).observe(queries.count)
+        metrics.DB_DURATION.labels(**labels).observe(queries.duration)
+        if not response.streaming:
+            metrics.RESPONSE_BYTES.labels(**labels).observe(
+                len(response.content)
+            )
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    """ Log requests that exceed the QUERY_BUDGET settings or repeat the
+        same query, which usually points at an N+1. """
+
+    def call(self, request):
+        log = QueryLog()
+        with record_queries(log):
+            response = self.get_response(request)
+
+        self.check(request, log)
+        return response
+
+    async def acall(self, request):
+        log = QueryLog()
+        with record_queries(log):
+            response = await self.get_response(request)
+
+        self.check(request, log)
+        return response
+
+    def check(self, request, log):
+        """ Log the problems with the queries of a finished request. """
+        budget = settings.QUERY_BUDGET
+        problems = log.problems(
+            max_queries=budget['MAX_QUERIES'],
+            max_db_time_ms=budget['MAX_DB_TIME_MS'],
+            max_repeats=budget['MAX_REPEATS'],
+        )
+        if problems:
+            logger.warning(
+                'Query budget exceeded by %s %s: %s',
+                request.method,
+                request.path,
+                log.report(problems),
+            )
+
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+PROFILE_SALT = 'core.profiling'
+
+
+def sign_profile_request():
+    """ Return a value for the X-Profile header, valid for
+        PROFILING_SIGNATURE_MAX_AGE seconds. """
+    return signing.TimestampSigner(salt=PROFILE_SALT).sign('profile')
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """ Profile a single request with cProfile when it carries a signed
+        X-Profile header, or when a staff user adds ?profile=1.
+        ?profile=inline returns the stats instead of the response, the
+        default writes a pstats file to PROFILING_DIR.
+
+        Under ASGI the event loop serves other requests while this one
+        waits, so only the view is profiled, on the thread that
+        async_read_view() runs it on. Views it does not wrap get an
+        empty profile. """
+
+    def call(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        return self.profile_response(request, response, profiler)
+
+    async def acall(self, request):
+        if not await sync_to_async(self.should_profile)(request):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        token = request_profiler.set(profiler)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_profiler.reset(token)
+
+        return self.profile_response(request, response, profiler)
+
+    def profile_response(self, request, response, profiler):
+        """ Return the stats, or the response naming the written file. """
+        if request.GET.get(PROFILE_PARAM) == 'inline':
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats('cumulative').print_stats(50)
+            return HttpResponse(output.getvalue(), content_type='text/plain')
+
+        response['X-Profile-File'] = self.write_profile(request, profiler)
+        return response
+
+    def should_profile(self, request):
+        """ Return whether the request asked for, & may be, profiled. """
+        signed = request.META.get(PROFILE_HEADER)
+        if signed:
+            try:
+                signing.TimestampSigner(salt=PROFILE_SALT).unsign(
+                    signed,
+                    max_age=settings.PROFILING_SIGNATURE_MAX_AGE,
+                )
+                return True
+            except signing.BadSignature:
+                return False
+
+        if PROFILE_PARAM not in request.GET:
+            return False
+        user = request.user
+        # API clients authenticate with tokens inside DRF, so look the
+        # token up here, which only costs flagged requests a query.
+        if not user.is_authenticated:
+            try:
+                authenticated = TokenAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                return False
+            if authenticated is None:
+                return False
+            user = authenticated[0]
+
+        return user.is_staff
+
+    def write_profile(self, request, profiler):
+        """ Write the profile to PROFILING_DIR & return its file name. """
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        filename = '{}-{}-{}-{}.prof'.format(
+            time.strftime('%Y%m%dT%H%M%S'),
+            os.getpid(),
+            request.method,
+            route.replace(':', '.'),
+        )
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(settings.PROFILING_DIR, filename))
+
+        return filename
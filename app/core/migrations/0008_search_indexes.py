@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-19 19:40
+
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+import core.db
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so the tables stay writable.
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_recipe_image_metadata'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        core.db.PostgresAddIndexConcurrently(
+            model_name='ingredient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='ingredient_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        core.db.PostgresAddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='recipe_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        core.db.PostgresAddIndexConcurrently(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='tag_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
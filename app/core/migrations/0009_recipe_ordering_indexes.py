@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-19 19:41
+
+from django.db import migrations, models
+
+import core.db
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so the recipe table stays writable.
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_search_indexes'),
+    ]
+
+    operations = [
+        core.db.AddIndexConcurrentlyOnPostgres(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+        ),
+        core.db.AddIndexConcurrentlyOnPostgres(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'price', 'id'], name='recipe_user_price_idx'),
+        ),
+        core.db.AddIndexConcurrentlyOnPostgres(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'time_minutes', 'id'], name='recipe_user_time_idx'),
+        ),
+        core.db.AddIndexConcurrentlyOnPostgres(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'title', 'id'], name='recipe_user_title_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import (
      AbstractBaseUser,
@@ -50,11 +51,22 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Set when the user is deleted, their data is purged in the background.
+    deleted_at = models.DateTimeField(null=True, editable=False)
 
     objects = UserManager()  # Django assignment of UserManager
 
     USERNAME_FIELD = 'email'
 
+    class Meta:
+        indexes = [
+            models.Index(
+                name='user_deleted_idx',
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+        ]
+
 
 class Recipe(models.Model):
     """Recipe object """
@@ -73,6 +85,51 @@ class Recipe(models.Model):
     # The following will take only the name of the function.
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
 
+    # Image metadata is computed once when the image is uploaded so that
+    # read paths never have to open the file from disk.
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_size = models.PositiveIntegerField(null=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
+
+    # Set when the recipe is deleted, the row is purged in the background.
+    deleted_at = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Finds the rows left to purge, and stays small as only those
+            # are in it.
+            models.Index(
+                name='recipe_deleted_idx',
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+            # One index for each ordering of the recipe list, which also
+            # serves its range filters & keyset pagination.
+            models.Index(
+                name='recipe_user_id_idx',
+                fields=['user', 'id'],
+            ),
+            models.Index(
+                name='recipe_user_price_idx',
+                fields=['user', 'price', 'id'],
+            ),
+            models.Index(
+                name='recipe_user_time_idx',
+                fields=['user', 'time_minutes', 'id'],
+            ),
+            models.Index(
+                name='recipe_user_title_idx',
+                fields=['user', 'title', 'id'],
+            ),
+            # Trigram index for the admin search on title.
+            GinIndex(
+                name='recipe_title_trgm',
+                fields=['title'],
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
     # String representation of the object is just its title
     def __str__(self):
         return self.title
@@ -86,6 +143,15 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                name='tag_name_trgm',
+                fields=['name'],
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -98,5 +164,14 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                name='ingredient_name_trgm',
+                fields=['name'],
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
     def __str__(self):
         return self.name
@@ -0,0 +1,147 @@
+"""
+Soft deletion & the background purge of deleted data
+"""
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.images import remove_image
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sent once per purged batch of tags or ingredients, with the ids of
+# their owners, as the rows are deleted without per row delete signals.
+purged = Signal()
+
+
+def soft_delete_user(user):
+    """ Mark a user deleted & log them out. Their data stays until the
+        purge removes it in batches. """
+    user.deleted_at = timezone.now()
+    user.is_active = False
+    user.save(update_fields=['deleted_at', 'is_active'])
+    Token.objects.filter(user=user).delete()
+
+
+def soft_delete_recipe(recipe):
+    """ Mark a recipe deleted, hiding it from the API straight away. """
+    recipe.deleted_at = timezone.now()
+    recipe.save(update_fields=['deleted_at'])
+
+
+def _raw_delete(model, ids):
+    """ Delete rows by id without loading them to send delete signals. """
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} '
+            f'WHERE id IN ({", ".join(["%s"] * len(ids))})',
+            ids,
+        )
+
+
+def _delete_recipes(ids):
+    """ Delete recipes & their links, returning their image names. """
+    images = list(
+        Recipe.objects.filter(id__in=ids).exclude(
+            image__isnull=True,
+        ).exclude(image='').values_list('image', flat=True).distinct()
+    )
+    with transaction.atomic():
+        Recipe.tags.through.objects.filter(recipe_id__in=ids).delete()
+        Recipe.ingredients.through.objects.filter(recipe_id__in=ids).delete()
+        # The rows are already unused, so skip loading them to send
+        # delete signals.
+        _raw_delete(Recipe, ids)
+    # Clones share the image of their original.
+    shared = set(
+        Recipe.objects.filter(image__in=images).values_list(
+            'image', flat=True,
+        )
+    )
+    for name in images:
+        if name not in shared:
+            remove_image(name)
+
+
+def _delete_attrs(model, through, column, ids):
+    """ Delete tags or ingredients & their links. """
+    user_ids = list(
+        model.objects.filter(id__in=ids).values_list(
+            'user_id', flat=True,
+        ).distinct()
+    )
+    with transaction.atomic():
+        through.objects.filter(**{f'{column}__in': ids}).delete()
+        _raw_delete(model, ids)
+    purged.send(sender=model, user_ids=user_ids)
+
+
+class Purger:
+    """ Remove soft deleted recipes & users in bounded batches, pausing
+        between batches so locks are short & replicas keep up. """
+
+    def __init__(self, batch_size=1000, pause=0.1, sleep=time.sleep):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.sleep = sleep
+
+    def batches(self, queryset):
+        """ Yield lists of up to batch_size ids from queryset until it is
+            empty. """
+        while True:
+            ids = list(queryset.values_list('id', flat=True)[
+                :self.batch_size
+            ])
+            if not ids:
+                return
+            yield ids
+            self.sleep(self.pause)
+
+    def purge_recipes(self, queryset):
+        """ Delete the recipes in queryset, returning how many. """
+        count = 0
+        for ids in self.batches(queryset.order_by('id')):
+            _delete_recipes(ids)
+            count += len(ids)
+        return count
+
+    def purge_user(self, user):
+        """ Delete a soft deleted user & all their data. """
+        self.purge_recipes(Recipe.objects.filter(user=user))
+        for model, through, column in [
+            (Tag, Recipe.tags.through, 'tag_id'),
+            (Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+        ]:
+            queryset = model.objects.filter(user=user).order_by('id')
+            for ids in self.batches(queryset):
+                _delete_attrs(model, through, column, ids)
+        # Only a few small rows, such as the token, are left to cascade.
+        user.delete()
+
+    def purge(self):
+        """ Purge everything soft deleted, returning the number of recipes
+            & users removed. """
+        recipes = self.purge_recipes(
+            Recipe.objects.filter(deleted_at__isnull=False)
+        )
+        users = 0
+        for user in get_user_model().objects.filter(
+            deleted_at__isnull=False,
+        ).order_by('id').iterator():
+            self.purge_user(user)
+            users += 1
+        if recipes or users:
+            logger.info('Purged %d recipes & %d users', recipes, users)
+        return recipes, users
@@ -0,0 +1,115 @@
+"""
+Recording & inspecting the SQL queries made while handling a request
+"""
+import functools
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+# Execute wrappers recording the queries of the current request. A context
+# variable rather than per connection wrappers, so the queries a view runs
+# on an executor thread are still recorded.
+_recorders = ContextVar('query_recorders', default=())
+
+
+def fingerprint(sql):
+    """ Normalize literals & placeholders out of sql, so statements that
+        differ only in their values compare equal. """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryLog:
+    """ Execute wrapper keeping the fingerprint & duration of each query.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (fingerprint(sql), time.perf_counter() - start)
+            )
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration_ms(self):
+        return sum(duration for _, duration in self.queries) * 1000
+
+    def repeated(self, max_repeats):
+        """ Return (fingerprint, count) of queries run more than
+            max_repeats times, the usual sign of an N+1. """
+        counts = Counter(sql for sql, _ in self.queries)
+        return [
+            (sql, count) for sql, count in counts.most_common()
+            if count > max_repeats
+        ]
+
+    def problems(self, max_queries=None, max_db_time_ms=None,
+                 max_repeats=None):
+        """ Return a description of each budget the queries exceed. """
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(
+                f'{self.count} queries exceed the budget of {max_queries}'
+            )
+        if max_db_time_ms is not None and self.duration_ms > max_db_time_ms:
+            problems.append(
+                f'{self.duration_ms:.1f}ms in queries exceeds the budget '
+                f'of {max_db_time_ms}ms'
+            )
+        if max_repeats is not None:
+            for sql, count in self.repeated(max_repeats):
+                problems.append(f'repeated {count}x: {sql}')
+
+        return problems
+
+    def report(self, problems):
+        """ Return a compact, single line report of problems. """
+        return (
+            f'{self.count} queries in {self.duration_ms:.1f}ms; '
+            + '; '.join(problems)
+        )
+
+
+@contextmanager
+def record_queries(recorder):
+    """ Pass every query made in the current context, on any thread it
+        is copied to, through the recorder execute wrapper. """
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+def run_recorders(execute, sql, params, many, context):
+    """ Execute wrapper handing the query to the active recorders. """
+    for recorder in _recorders.get():
+        execute = functools.partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+def add_recorders_wrapper(sender, connection, **kwargs):
+    """ Install the recorders wrapper on new database connections. """
+    if run_recorders not in connection.execute_wrappers:
+        connection.execute_wrappers.append(run_recorders)
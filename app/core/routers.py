@@ -0,0 +1,62 @@
+"""
+Database routers
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Alias of the replica reads should go to, set only for the duration of
+# a request that is allowed to read from a replica.
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def _pin_key(user):
+    return f'replica-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    """ Send the user's reads to the primary for a short while so they
+        see their own writes despite replication lag. """
+    cache.set(_pin_key(user), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def replica_for(user):
+    """ Return the replica alias to read from for user, or None to read
+        from the primary. """
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user.is_authenticated and cache.get(_pin_key(user)):
+        return None
+
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def read_from(alias):
+    """ Route reads made inside the block to the database alias. """
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """ Send reads to a replica inside read_from(), everything else to
+        the primary. """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,26 @@
+"""
+Helpers for tests
+"""
+from contextlib import contextmanager
+
+from django.db import connections
+
+from core.queries import QueryLog
+
+
+class QueryBudgetMixin:
+    """ TestCase mixin to assert an endpoint stays within a query budget.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries=None, max_db_time_ms=None,
+                          max_repeats=1, using='default'):
+        """ Fail if the block exceeds max_queries or max_db_time_ms, or
+            runs any query more than max_repeats times. """
+        log = QueryLog()
+        with connections[using].execute_wrapper(log):
+            yield log
+
+        problems = log.problems(max_queries, max_db_time_ms, max_repeats)
+        if problems:
+            self.fail(log.report(problems))
@@ -1,11 +1,18 @@
 """
 Test for Django Admin modifications
 """
-from django.test import TestCase
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
 
+from core import models
+from core.admin import EstimatedCountPaginator
+
 
 class AdminSiteTests(TestCase):
     """ Tests for Django admin """
@@ -45,3 +52,118 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_recipe_list(self):
+        """ Test that recipes are listed on the page """
+        recipe = models.Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=5,
+            price='4.50',
+        )
+        url = reverse('admin:core_recipe_changelist')
+        res = self.client.get(url)
+
+        self.assertContains(res, recipe.title)
+        self.assertContains(res, self.user.email)
+
+    def test_edit_recipe_page_renders_selected_tags_only(self):
+        """ Test the edit recipe page only renders the chosen tags """
+        recipe = models.Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=5,
+            price='4.50',
+        )
+        chosen = models.Tag.objects.create(user=self.user, name='Chosen')
+        models.Tag.objects.create(user=self.user, name='Unused')
+        recipe.tags.add(chosen)
+
+        url = reverse('admin:core_recipe_change', args=[recipe.id])
+        res = self.client.get(url)
+
+        self.assertContains(res, 'Chosen')
+        self.assertNotContains(res, 'Unused')
+
+    def test_tag_and_ingredient_lists(self):
+        """ Test the tag & ingredient pages list their objects """
+        models.Tag.objects.create(user=self.user, name='Vegan')
+        models.Ingredient.objects.create(user=self.user, name='Kale')
+
+        res = self.client.get(reverse('admin:core_tag_changelist'))
+        self.assertContains(res, 'Vegan')
+        res = self.client.get(
+            reverse('admin:core_ingredient_changelist'), {'q': 'Kal'},
+        )
+        self.assertContains(res, 'Kale')
+
+    def test_search_case_insensitive_substring(self):
+        """ Test admin search matches any part of a name in any case """
+        models.Tag.objects.create(user=self.user, name='Gluten Free')
+        models.Tag.objects.create(user=self.user, name='100%_Vegan')
+
+        url = reverse('admin:core_tag_changelist')
+        self.assertContains(self.client.get(url, {'q': 'TEN f'}), 'Gluten')
+        res = self.client.get(url, {'q': '0%_'})
+        self.assertContains(res, 'Vegan')
+        self.assertNotContains(res, 'Gluten')
+        self.assertNotContains(self.client.get(url, {'q': '1_0'}), 'Vegan')
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs pg_trgm')
+    def test_search_uses_trigram_index(self):
+        """ Test the search lookup can use the trigram index """
+        queryset = models.Recipe.objects.filter(title__trgm_icontains='cur')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+
+        self.assertIn('recipe_title_trgm', plan)
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+class EstimatedCountPaginatorTests(TestCase):
+    """ Test counting admin lists """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        models.Tag.objects.create(user=self.user, name='Vegan')
+
+    @patch('core.admin.estimated_count', return_value=5000)
+    def test_large_table_uses_estimate(self, patched_estimate):
+        """ Test an unfiltered large table uses the estimate """
+        paginator = EstimatedCountPaginator(
+            models.Tag.objects.order_by('id'), 100,
+        )
+
+        self.assertEqual(paginator.count, 5000)
+        patched_estimate.assert_called_once_with(models.Tag, 'default')
+
+    @patch('core.admin.estimated_count', return_value=10)
+    def test_small_table_counted(self, patched_estimate):
+        """ Test a table below the threshold is counted exactly """
+        paginator = EstimatedCountPaginator(
+            models.Tag.objects.order_by('id'), 100,
+        )
+
+        self.assertEqual(paginator.count, 1)
+
+    @patch('core.admin.estimated_count', return_value=5000)
+    def test_filtered_list_counted(self, patched_estimate):
+        """ Test a filtered list is counted exactly """
+        paginator = EstimatedCountPaginator(
+            models.Tag.objects.filter(name='Vegan').order_by('id'), 100,
+        )
+
+        self.assertEqual(paginator.count, 1)
+        patched_estimate.assert_not_called()
+
+    def test_no_estimate_counted(self):
+        """ Test databases without estimates are counted exactly """
+        paginator = EstimatedCountPaginator(
+            models.Tag.objects.order_by('id'), 100,
+        )
+
+        self.assertEqual(paginator.count, 1)
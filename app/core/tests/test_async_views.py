@@ -0,0 +1,163 @@
+"""
+Tests for the async read view wrappers
+"""
+import asyncio
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from django.test.client import AsyncRequestFactory
+from django.urls import path
+
+from core import async_views
+from core.middleware import sign_profile_request
+from core.tests.test_middleware import sample
+
+
+def slow_view(request):
+    """ A view that spends its time waiting, like on a slow database. """
+    time.sleep(0.2)
+    return HttpResponse(request.method)
+
+
+def query_view(request):
+    """ A view making two database queries. """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.execute('SELECT 2')
+    return HttpResponse(request.method)
+
+
+# Used as ROOT_URLCONF to serve the views through the whole ASGI stack.
+urlpatterns = [
+    path('slow/', async_views.async_read_view(slow_view)),
+    path('query/', async_views.async_read_view(query_view), name='query'),
+]
+
+
+@override_settings(ASYNC_READ_THREADS=8)
+class AsyncReadViewTests(SimpleTestCase):
+    """ Test serving reads through the bounded thread pool. """
+
+    def setUp(self):
+        async_views._executor = None
+        self.factory = AsyncRequestFactory()
+        self.view = async_views.async_read_view(slow_view)
+
+    def tearDown(self):
+        async_views.get_executor().shutdown()
+        async_views._executor = None
+
+    def test_reads_served_concurrently(self):
+        """ Test slow reads overlap instead of queueing behind each other """
+        async def run_reads():
+            return await asyncio.gather(*[
+                self.view(self.factory.get('/')) for _ in range(8)
+            ])
+
+        start = time.perf_counter()
+        responses = asyncio.run(run_reads())
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([res.content for res in responses], [b'GET'] * 8)
+        # Sequentially this takes 1.6 seconds.
+        self.assertLess(elapsed, 0.8)
+
+    def test_writes_use_sync_path(self):
+        """ Test writes are not sent to the read pool """
+        res = asyncio.run(self.view(self.factory.post('/')))
+
+        self.assertEqual(res.content, b'POST')
+        self.assertIsNone(async_views._executor)
+
+    def test_wrapper_keeps_view_attributes(self):
+        """ Test the wrapped view stays csrf exempt like DRF views """
+        slow_view.csrf_exempt = True
+        try:
+            view = async_views.async_read_view(slow_view)
+            self.assertTrue(view.csrf_exempt)
+            self.assertTrue(asyncio.iscoroutinefunction(view))
+        finally:
+            del slow_view.csrf_exempt
+
+
+@override_settings(
+    ASYNC_READ_THREADS=8,
+    ROOT_URLCONF='core.tests.test_async_views',
+)
+class AsgiConcurrencyTests(SimpleTestCase):
+    """ Test reads overlap when served through the real middleware. """
+
+    def setUp(self):
+        async_views._executor = None
+
+    def tearDown(self):
+        async_views.get_executor().shutdown()
+        async_views._executor = None
+
+    def test_reads_concurrent_through_middleware(self):
+        """ Test no middleware funnels the requests through one thread """
+        client = AsyncClient()
+
+        async def run_reads():
+            return await asyncio.gather(*[
+                client.get('/slow/') for _ in range(8)
+            ])
+
+        start = time.perf_counter()
+        responses = asyncio.run(run_reads())
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([res.content for res in responses], [b'GET'] * 8)
+        self.assertLess(elapsed, 0.8)
+
+    def test_read_profiled_on_pool_thread(self):
+        """ Test a profiled read records the view run in the pool """
+        # The Django 3.2 AsyncClient takes raw header names, and drops
+        # query parameters given as data.
+        res = asyncio.run(AsyncClient().get(
+            '/slow/?profile=inline',
+            **{'x-profile': sign_profile_request()},
+        ))
+
+        self.assertIn(b'slow_view', res.content)
+
+
+@override_settings(ROOT_URLCONF='core.tests.test_async_views')
+class AsgiQueryRecordingTests(SimpleTestCase):
+    """ Test queries run in the read pool are recorded for the request. """
+    databases = {'default'}
+
+    def setUp(self):
+        async_views._executor = None
+
+    def tearDown(self):
+        async_views.get_executor().shutdown()
+        async_views._executor = None
+
+    def test_pool_queries_in_metrics(self):
+        """ Test the queries of a pooled read reach the route metrics """
+        labels = {'route': 'query', 'method': 'GET'}
+        queries = sample('http_request_db_queries_sum', **labels)
+
+        asyncio.run(AsyncClient().get('/query/'))
+
+        self.assertEqual(
+            sample('http_request_db_queries_sum', **labels),
+            queries + 2,
+        )
+
+    def test_pool_queries_checked_against_budget(self):
+        """ Test the queries of a pooled read count toward the budget """
+        middleware = settings.MIDDLEWARE + [
+            'core.middleware.QueryBudgetMiddleware',
+        ]
+        budget = dict(settings.QUERY_BUDGET, MAX_QUERIES=1)
+
+        with override_settings(MIDDLEWARE=middleware, QUERY_BUDGET=budget):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                asyncio.run(AsyncClient().get('/query/'))
+
+        self.assertIn('2 queries exceed the budget of 1', logs.output[0])
@@ -0,0 +1,180 @@
+"""
+Tests for the batch API
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.async_views import async_read_view
+from core.models import Recipe, Tag
+
+BATCH_URL = reverse('batch')
+
+
+def resolve_async(path):
+    """ Resolve path to its view wrapped like with ASYNC_READ_VIEWS. """
+    match = resolve(path)
+    match.func = async_read_view(match.func)
+    return match
+
+
+class PublicBatchApiTests(TestCase):
+    """ Test unauthenticated batch requests """
+
+    def test_auth_required(self):
+        """ Test authentication is required for batches """
+        res = APIClient().post(BATCH_URL, {'requests': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """ Test authenticated batch requests """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def post(self, requests, **params):
+        return self.client.post(
+            BATCH_URL, {'requests': requests, **params}, format='json',
+        )
+
+    def test_batch(self):
+        """ Test running several requests in one batch """
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.post([
+            {'method': 'GET', 'path': '/api/user/me/'},
+            {
+                'method': 'POST',
+                'path': '/api/recipe/recipes/',
+                'body': {
+                    'title': 'Curry',
+                    'time_minutes': 30,
+                    'price': '5.00',
+                },
+            },
+            {'method': 'GET', 'path': '/api/recipe/tags/?assigned_only=0'},
+        ])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.data['responses']
+        self.assertEqual(
+            [r['status'] for r in responses], [200, 201, 200],
+        )
+        self.assertEqual(responses[0]['body']['email'], self.user.email)
+        self.assertEqual(responses[1]['body']['title'], 'Curry')
+        self.assertEqual(responses[2]['body'][0]['name'], 'Vegan')
+        self.assertTrue(Recipe.objects.filter(user=self.user).exists())
+
+    def test_batch_authenticates_once(self):
+        """ Test requests in a batch do not look up the token again """
+        with self.assertNumQueries(1):
+            res = self.post([
+                {'method': 'GET', 'path': '/api/user/me/'},
+                {'method': 'GET', 'path': '/api/user/me/'},
+            ])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_batch_errors_returned(self):
+        """ Test failed & unknown requests return their own status """
+        res = self.post([
+            {'method': 'GET', 'path': '/api/recipe/recipes/999/'},
+            {'method': 'GET', 'path': '/api/recipe/nothing-here/'},
+            {'method': 'GET', 'path': '/api/user/me/'},
+        ])
+
+        self.assertEqual(
+            [r['status'] for r in res.data['responses']], [404, 404, 200],
+        )
+
+    def test_atomic_batch_rolled_back(self):
+        """ Test a failed request rolls back an atomic batch """
+        res = self.post([
+            {
+                'method': 'POST',
+                'path': '/api/recipe/recipes/',
+                'body': {'title': 'Curry', 'time_minutes': 30,
+                         'price': '5.00'},
+            },
+            {
+                'method': 'POST',
+                'path': '/api/recipe/recipes/',
+                'body': {'title': 'No price'},
+            },
+            {'method': 'GET', 'path': '/api/user/me/'},
+        ], atomic=True)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [r['status'] for r in res.data['responses']], [201, 400],
+        )
+        self.assertFalse(Recipe.objects.exists())
+
+    @mock.patch('core.batch.resolve', side_effect=resolve_async)
+    def test_atomic_batch_reads_own_writes(self, patched_resolve):
+        """ Test reads of an atomic batch see its earlier writes when
+            the read views are async """
+        res = self.post([
+            {
+                'method': 'POST',
+                'path': '/api/recipe/recipes/',
+                'body': {'title': 'Curry', 'time_minutes': 30,
+                         'price': '5.00'},
+            },
+            {'method': 'GET', 'path': '/api/recipe/recipes/'},
+        ], atomic=True)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['status'] for r in res.data['responses']], [201, 200],
+        )
+        recipes = res.data['responses'][1]['body']
+        self.assertEqual([r['title'] for r in recipes], ['Curry'])
+
+    def test_batch_idempotency_key_not_shared(self):
+        """ Test the requests of a batch do not reuse its Idempotency-Key
+        """
+        cache.clear()
+        recipe = {
+            'method': 'POST',
+            'path': '/api/recipe/recipes/',
+            'body': {'title': 'Curry', 'time_minutes': 30, 'price': '5.00'},
+        }
+        res = self.client.post(
+            BATCH_URL, {'requests': [recipe, recipe]}, format='json',
+            HTTP_IDEMPOTENCY_KEY='abc',
+        )
+
+        self.assertEqual(
+            [r['status'] for r in res.data['responses']], [201, 201],
+        )
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_path_not_allowed(self):
+        """ Test only the recipe & user APIs can be batched """
+        res = self.post([{'method': 'POST', 'path': '/api/batch/'}])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_too_many_requests(self):
+        """ Test the number of requests in a batch is limited """
+        res = self.post([{'method': 'GET', 'path': '/api/user/me/'}] * 3)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,13 +1,19 @@
 """
 Test custom Django management command
 """
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
+
+from core.management.commands.import_times import (
+    package_totals,
+    parse_import_times,
+)
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -38,3 +44,90 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_check):
+        """ Test the delay between attempts backs off exponentially """
+        patched_check.side_effect = [OperationalError] * 8 + [True]
+
+        call_command('wait_for_db')
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(delays[:3], [0.05, 0.1, 0.2])
+        self.assertEqual(max(delays), 2.0)
+
+    @patch('time.monotonic')
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(
+        self, patched_sleep, patched_monotonic, patched_check
+    ):
+        """ Test giving up once the deadline has passed """
+        patched_check.side_effect = OperationalError
+        patched_monotonic.side_effect = [0, 1, 9, 11]
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=10)
+
+        self.assertEqual(patched_check.call_count, 3)
+
+    @override_settings(DATABASES={'default': {
+        'HOST': 'db.example.com',
+        'PORT': '5432',
+    }})
+    @patch('time.sleep')
+    @patch('socket.create_connection')
+    def test_wait_for_db_port_closed(
+        self, patched_connect, patched_sleep, patched_check
+    ):
+        """ Test the full check is skipped while the port is closed """
+        patched_connect.side_effect = [ConnectionRefusedError] * 2 + [
+            MagicMock(),
+        ]
+
+        call_command('wait_for_db')
+
+        self.assertEqual(patched_connect.call_count, 3)
+        patched_connect.assert_called_with(
+            ('db.example.com', 5432),
+            timeout=1.0,
+        )
+        patched_check.assert_called_once_with(databases=['default'])
+
+    @patch('time.sleep')
+    @patch(
+        'core.management.commands.wait_for_db.Command.pending_migrations'
+    )
+    def test_wait_for_db_migrations(
+        self, patched_pending, patched_sleep, patched_check
+    ):
+        """ Test waiting until no migrations are pending """
+        patched_pending.side_effect = [True, True, False]
+
+        call_command('wait_for_db', migrations=True)
+
+        self.assertEqual(patched_pending.call_count, 3)
+        self.assertEqual(patched_check.call_count, 3)
+
+
+class ImportTimesTests(SimpleTestCase):
+    """ Test the import time audit """
+
+    def test_parse_import_times(self):
+        """ Test parsing `python -X importtime` output """
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   django.utils\n'
+            'import time:       300 |        420 | django\n'
+            'import time:        50 |         50 | PIL\n'
+        )
+
+        times = parse_import_times(output)
+
+        self.assertEqual(times, [
+            ('django.utils', 120, 120),
+            ('django', 300, 420),
+            ('PIL', 50, 50),
+        ])
+        totals = package_totals(times)
+        self.assertEqual(totals['django'], 420)
+        self.assertEqual(totals['PIL'], 50)
@@ -0,0 +1,75 @@
+"""
+Tests for database connection helpers
+"""
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from core.db import close_unhealthy_connections
+
+
+def mock_connection(usable=True, connected=True, in_atomic_block=False):
+    """ Create and return a mock database connection wrapper. """
+    conn = MagicMock()
+    conn.connection = object() if connected else None
+    conn.in_atomic_block = in_atomic_block
+    conn.is_usable.return_value = usable
+    conn.health_checked_at = None
+    return conn
+
+
+@patch('core.db.connections')
+class ConnectionHealthCheckTests(SimpleTestCase):
+    """ Test health checks on persistent connections. """
+
+    def test_unusable_connection_closed(self, patched_connections):
+        """ Test a connection that fails the check is closed """
+        conn = mock_connection(usable=False)
+        patched_connections.all.return_value = [conn]
+
+        close_unhealthy_connections()
+
+        conn.close.assert_called_once()
+
+    def test_usable_connection_kept(self, patched_connections):
+        """ Test a healthy connection is reused """
+        conn = mock_connection()
+        patched_connections.all.return_value = [conn]
+
+        close_unhealthy_connections()
+
+        conn.close.assert_not_called()
+
+    def test_closed_or_atomic_connection_skipped(self, patched_connections):
+        """ Test no check runs without a connection or inside a transaction
+        """
+        closed = mock_connection(connected=False)
+        atomic = mock_connection(usable=False, in_atomic_block=True)
+        patched_connections.all.return_value = [closed, atomic]
+
+        close_unhealthy_connections()
+
+        closed.is_usable.assert_not_called()
+        atomic.is_usable.assert_not_called()
+        atomic.close.assert_not_called()
+
+    @override_settings(DB_CONN_HEALTH_CHECK_SECONDS=10)
+    def test_recently_checked_connection_skipped(self, patched_connections):
+        """ Test a connection is checked at most once per interval """
+        conn = mock_connection()
+        patched_connections.all.return_value = [conn]
+
+        with patch('core.db.time.monotonic', return_value=100):
+            close_unhealthy_connections()
+            close_unhealthy_connections()
+        with patch('core.db.time.monotonic', return_value=111):
+            close_unhealthy_connections()
+
+        self.assertEqual(conn.is_usable.call_count, 2)
+
+    @override_settings(DB_CONN_HEALTH_CHECKS=False)
+    def test_health_checks_disabled(self, patched_connections):
+        """ Test nothing is checked when health checks are disabled """
+        close_unhealthy_connections()
+
+        patched_connections.all.assert_not_called()
@@ -0,0 +1,158 @@
+"""
+Tests for middleware
+"""
+import os
+import pstats
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.middleware import sign_profile_request
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+def sample(name, **labels):
+    """ Return the current value of a metric sample, 0 if missing. """
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsMiddlewareTests(TestCase):
+    """ Test recording request metrics. """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.labels = {'route': 'recipe:recipe-list', 'method': 'GET'}
+
+    def test_request_recorded_per_route(self):
+        """ Test latency, queries & size are recorded for the route. """
+        requests = sample('http_request_duration_seconds_count', **self.labels)
+        ok = sample('http_requests_total', status='200', **self.labels)
+        queries = sample('http_request_db_queries_sum', **self.labels)
+        size = sample('http_response_size_bytes_sum', **self.labels)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sample('http_request_duration_seconds_count', **self.labels),
+            requests + 1,
+        )
+        self.assertEqual(
+            sample('http_requests_total', status='200', **self.labels),
+            ok + 1,
+        )
+        self.assertGreater(
+            sample('http_request_db_queries_sum', **self.labels),
+            queries,
+        )
+        self.assertEqual(
+            sample('http_response_size_bytes_sum', **self.labels),
+            size + len(res.content),
+        )
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_metrics_endpoint(self):
+        """ Test metrics are exposed for scraping. """
+        self.client.get(RECIPES_URL)
+
+        res = APIClient().get(METRICS_URL, HTTP_AUTHORIZATION='Bearer scrape')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'route="recipe:recipe-list"', res.content)
+
+    def test_metrics_endpoint_requires_token(self):
+        """ Test metrics are refused without the configured token. """
+        for token, header in [
+            ('', ''),
+            ('', 'Bearer '),
+            ('scrape', ''),
+            ('scrape', 'Bearer wrong'),
+        ]:
+            with self.subTest(token=token, header=header):
+                with override_settings(METRICS_TOKEN=token):
+                    res = APIClient().get(
+                        METRICS_URL, HTTP_AUTHORIZATION=header,
+                    )
+
+                self.assertEqual(
+                    res.status_code, status.HTTP_401_UNAUTHORIZED,
+                )
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """ Test profiling requests on demand. """
+
+    def setUp(self):
+        self.profiling_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            PROFILING_DIR=self.profiling_dir.name,
+        )
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.profiling_dir.cleanup()
+
+    def test_not_profiled_by_default(self):
+        """ Test ordinary requests are not profiled. """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('X-Profile-File', res)
+        self.assertEqual(os.listdir(self.profiling_dir.name), [])
+
+    def test_signed_header_writes_profile(self):
+        """ Test a signed header profiles the request to a file. """
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_X_PROFILE=sign_profile_request(),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        path = os.path.join(self.profiling_dir.name, res['X-Profile-File'])
+        self.assertIn('recipe.recipe-list', path)
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+    def test_bad_signature_ignored(self):
+        """ Test a forged header is not profiled. """
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='profile:x:y')
+
+        self.assertNotIn('X-Profile-File', res)
+
+    def test_staff_query_flag_inline(self):
+        """ Test staff users can get the profile back inline. """
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(RECIPES_URL, {'profile': 'inline'})
+
+        self.assertEqual(res['Content-Type'], 'text/plain')
+        self.assertIn(b'function calls', res.content)
+
+    def test_query_flag_requires_staff(self):
+        """ Test non staff users cannot profile with the query flag. """
+        res = self.client.get(RECIPES_URL, {'profile': 'inline'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
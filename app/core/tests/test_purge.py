@@ -0,0 +1,216 @@
+"""
+Tests for soft deletion & purging
+"""
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.images import RENDITION_BYTES_KEY, remove_image
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from core.purge import Purger, soft_delete_recipe, soft_delete_user
+
+
+def create_recipe(user, **params):
+    """ Create and return a sample recipe """
+    return Recipe.objects.create(
+        user=user, title='Recipe', time_minutes=5, price='1.00', **params
+    )
+
+
+class PurgeTests(TestCase):
+    """ Test soft deletion & the background purge """
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.pauses = []
+        self.purger = Purger(batch_size=2, sleep=self.pauses.append)
+
+    def save_image(self, name):
+        """ Store an image file & return its name. """
+        return default_storage.save(name, ContentFile(b'image'))
+
+    def test_soft_delete_user(self):
+        """ Test deleting a user keeps their data & logs them out """
+        Token.objects.create(user=self.user)
+        create_recipe(self.user)
+
+        soft_delete_user(self.user)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.deleted_at)
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_purge_user(self):
+        """ Test purging a user removes all their data in batches """
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for i in range(5):
+            recipe = create_recipe(self.user)
+            recipe.tags.add(*tags)
+            recipe.ingredients.add(ingredient)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(other)
+        soft_delete_user(self.user)
+
+        self.assertEqual(self.purger.purge(), (0, 1))
+
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertFalse(Tag.objects.exists())
+        self.assertFalse(Ingredient.objects.exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        # 3 batches of recipes, 2 of tags & 1 of ingredients.
+        self.assertEqual(len(self.pauses), 6)
+
+    def test_purge_user_invalidates_stats_per_batch(self):
+        """ Test the cached statistics are dropped once per batch of tags
+            or ingredients, not once per row """
+        for i in range(3):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+        Ingredient.objects.create(user=self.user, name='Salt')
+        soft_delete_user(self.user)
+
+        with patch('recipe.stats.cache') as patched_cache:
+            self.purger.purge()
+
+        patched_cache.delete.assert_not_called()
+        # 2 batches of tags & 1 of ingredients.
+        self.assertEqual(patched_cache.delete_many.call_count, 3)
+        patched_cache.delete_many.assert_called_with(
+            [f'recipe-stats:{self.user.id}'],
+        )
+
+    def test_purge_recipes(self):
+        """ Test purging deleted recipes removes their images """
+        name = self.save_image('uploads/recipe/deleted.jpg')
+        deleted = create_recipe(self.user, image=name)
+        deleted.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        kept = create_recipe(self.user)
+        soft_delete_recipe(deleted)
+
+        self.assertEqual(self.purger.purge(), (1, 0))
+
+        self.assertEqual(list(Recipe.objects.all()), [kept])
+        self.assertEqual(Tag.objects.count(), 1)
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_purge_keeps_shared_image(self):
+        """ Test an image shared with a clone is kept """
+        name = self.save_image('uploads/recipe/shared.jpg')
+        deleted = create_recipe(self.user, image=name)
+        create_recipe(self.user, image=name)
+        soft_delete_recipe(deleted)
+
+        self.purger.purge()
+
+        self.assertTrue(default_storage.exists(name))
+
+    def test_purge_removes_renditions(self):
+        """ Test the resized copies of a purged image are removed """
+        name = self.save_image('uploads/recipe/resized.jpg')
+        rendition = os.path.join(
+            'cache', 'recipe', '300', os.path.basename(name),
+        )
+        with override_settings(
+            RECIPE_IMAGE_CACHE_DIR='cache', RECIPE_IMAGE_WIDTHS=[300],
+        ):
+            self.save_image(rendition)
+            soft_delete_recipe(create_recipe(self.user, image=name))
+
+            self.purger.purge()
+
+        self.assertFalse(default_storage.exists(rendition))
+
+    @override_settings(
+        RECIPE_IMAGE_CACHE_DIR='cache', RECIPE_IMAGE_WIDTHS=[300, 600],
+    )
+    def test_remove_image_updates_cache_total(self):
+        """ Test removing an image deletes its renditions from disk & takes
+            their bytes off the rendition cache total """
+        name = self.save_image('uploads/recipe/removed.jpg')
+        renditions = [
+            self.save_image(os.path.join(
+                'cache', 'recipe', str(width), os.path.basename(name),
+            ))
+            for width in [300, 600]
+        ]
+        cache.set(RENDITION_BYTES_KEY, 100)
+
+        remove_image(name)
+
+        for path in [name] + renditions:
+            self.assertFalse(
+                os.path.exists(os.path.join(self.media_root, path)), path,
+            )
+        self.assertEqual(cache.get(RENDITION_BYTES_KEY), 100 - 2 * 5)
+
+    def test_purge_command(self):
+        """ Test the purge_deleted command """
+        soft_delete_recipe(create_recipe(self.user))
+        out = StringIO()
+
+        call_command('purge_deleted', '--pause=0', stdout=out)
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertIn('Purged 1 recipes & 0 users', out.getvalue())
+
+
+class AdminSoftDeleteTests(TestCase):
+    """ Test deleting users in the admin """
+
+    def test_admin_delete_user(self):
+        """ Test deleting a user in the admin soft deletes them """
+        admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        create_recipe(user)
+        self.client.force_login(admin_user)
+
+        url = reverse('admin:core_user_delete', args=[user.id])
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.client.post(url, {'post': 'yes'})
+
+        user.refresh_from_db()
+        self.assertIsNotNone(user.deleted_at)
+        self.assertEqual(Recipe.objects.count(), 1)
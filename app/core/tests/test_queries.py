@@ -0,0 +1,118 @@
+"""
+Tests for query inspection
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.queries import QueryLog, fingerprint
+from core.testing import QueryBudgetMixin
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def run_queries(log, *statements):
+    """ Feed statements through the log as if they were executed. """
+    for sql in statements:
+        log(lambda *args: None, sql, None, False, {})
+
+
+class FingerprintTests(SimpleTestCase):
+    """ Test normalizing SQL statements. """
+
+    def test_literals_normalized(self):
+        """ Test statements differing in values share a fingerprint. """
+        self.assertEqual(
+            fingerprint("SELECT * FROM core_tag WHERE id = 1 AND name = 'a'"),
+            fingerprint("SELECT * FROM core_tag WHERE id = 22 AND name = 'b'"),
+        )
+
+    def test_in_lists_collapsed(self):
+        """ Test IN lists of any length share a fingerprint. """
+        self.assertEqual(
+            fingerprint('SELECT * FROM core_tag WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM core_tag WHERE id IN (...)',
+        )
+
+    def test_identifiers_kept(self):
+        """ Test digits inside identifiers are not normalized. """
+        self.assertEqual(
+            fingerprint('SELECT "T3"."id" FROM core_recipe_tags T3'),
+            'SELECT "T3"."id" FROM core_recipe_tags T3',
+        )
+
+
+class QueryLogTests(SimpleTestCase):
+    """ Test checking queries against budgets. """
+
+    def test_repeated_queries_reported(self):
+        """ Test the same query run per row is flagged. """
+        log = QueryLog()
+        run_queries(log, 'SELECT * FROM core_recipe', *[
+            f'SELECT * FROM core_tag WHERE recipe_id = {i}' for i in range(4)
+        ])
+
+        problems = log.problems(max_repeats=1)
+
+        self.assertEqual(problems, [
+            'repeated 4x: SELECT * FROM core_tag WHERE recipe_id = ?',
+        ])
+
+    def test_query_count_budget(self):
+        """ Test exceeding the query count is reported. """
+        log = QueryLog()
+        run_queries(log, 'SELECT 1', 'SELECT 2', 'SELECT 3')
+
+        self.assertEqual(log.problems(max_queries=3), [])
+        self.assertEqual(
+            log.problems(max_queries=2),
+            ['3 queries exceed the budget of 2'],
+        )
+
+
+class QueryBudgetMixinTests(QueryBudgetMixin, TestCase):
+    """ Test the query budget test helper. """
+
+    def test_within_budget(self):
+        """ Test a block within budget passes. """
+        with self.assertQueryBudget(max_queries=1) as log:
+            get_user_model().objects.count()
+
+        self.assertEqual(log.count, 1)
+
+    def test_over_budget_fails(self):
+        """ Test a block over budget fails the test. """
+        with self.assertRaises(AssertionError):
+            with self.assertQueryBudget(max_queries=0):
+                get_user_model().objects.count()
+
+
+@override_settings(QUERY_BUDGET={
+    'MAX_QUERIES': 0,
+    'MAX_DB_TIME_MS': 1000,
+    'MAX_REPEATS': 3,
+})
+class QueryBudgetMiddlewareTests(TestCase):
+    """ Test logging requests over their query budget. """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_over_budget_logged(self):
+        """ Test a request over budget is logged with a report. """
+        middleware = [
+            'core.middleware.QueryBudgetMiddleware',
+        ]
+        with self.modify_settings(MIDDLEWARE={'append': middleware}):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                self.client.get(TAGS_URL)
+
+        self.assertIn(f'GET {TAGS_URL}', logs.output[0])
+        self.assertIn('exceed the budget of 0', logs.output[0])
@@ -0,0 +1,85 @@
+"""
+Tests for the read replica database router
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TestCase):
+    """ Test routing reads between the primary and replicas. """
+
+    def setUp(self):
+        cache.clear()
+        self.router = routers.ReplicaRouter()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+
+    def test_reads_default_to_primary(self):
+        """ Test reads go to the primary outside of read_from() """
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_read_from_replica(self):
+        """ Test reads inside read_from() go to the replica """
+        with routers.read_from('replica1'):
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica1')
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_replica_for_user(self):
+        """ Test a replica is picked for users who have not written """
+        self.assertEqual(routers.replica_for(self.user), 'replica1')
+
+    def test_pinned_user_reads_from_primary(self):
+        """ Test a user who just wrote reads from the primary """
+        routers.pin_to_primary(self.user)
+
+        self.assertIsNone(routers.replica_for(self.user))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """ Test the primary is used when there are no replicas """
+        self.assertIsNone(routers.replica_for(self.user))
+
+    def test_api_write_pins_user(self):
+        """ Test creating a recipe keeps the user's reads on the primary """
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {
+            'title': 'Sample Recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+        }
+
+        res = client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(routers.replica_for(self.user))
+
+    def test_view_error_leaves_replica(self):
+        """ Test reads go back to the primary after a read fails """
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with patch.object(RecipeViewSet, 'list', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                client.get(RECIPES_URL)
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
@@ -0,0 +1,141 @@
+"""
+Tests for throttling
+"""
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import SlidingWindowThrottle, parse_rate
+
+
+def make_view(scope='recipes', action='list'):
+    """ Return a stand-in for a view with a throttle scope. """
+    return MagicMock(throttle_scope=scope, action=action)
+
+
+@override_settings(THROTTLE_RATES={
+    'recipes': '4/min',
+    'recipes.upload_image': '1/min',
+})
+class SlidingWindowThrottleTests(SimpleTestCase):
+    """ Test the sliding window throttle """
+
+    def setUp(self):
+        cache.clear()
+        self.request = MagicMock(
+            user=AnonymousUser(),
+            META={'REMOTE_ADDR': '10.0.0.1'},
+        )
+
+    def allow(self, now, view=None, request=None):
+        throttle = SlidingWindowThrottle()
+        with patch.object(SlidingWindowThrottle, 'timer', return_value=now):
+            return throttle.allow_request(
+                request or self.request, view or make_view(),
+            ), throttle
+
+    def test_parse_rate(self):
+        """ Test parsing rates """
+        self.assertEqual(parse_rate('100/min'), (100, 60))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+        self.assertEqual(parse_rate('20/hour'), (20, 3600))
+
+    def test_limit_within_window(self):
+        """ Test requests over the rate are refused """
+        results = [self.allow(600 + i)[0] for i in range(5)]
+
+        self.assertEqual(results, [True, True, True, True, False])
+
+    def test_previous_window_weighted(self):
+        """ Test the previous window counts for the part still within the
+            sliding window """
+        for i in range(4):
+            self.allow(600 + i)
+
+        # Half way through the next window, 2 of the 4 still count.
+        results = [self.allow(690 + i)[0] for i in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+
+    def test_previous_window_not_stale(self):
+        """ Test late counts of the previous window made by other workers
+            are seen """
+        self.assertTrue(self.allow(660)[0])
+        cache.set('throttle:recipes:10.0.0.1:10', 8)
+
+        self.assertFalse(self.allow(661)[0])
+
+    def test_wait(self):
+        """ Test the wait until the window moves on """
+        allowed, throttle = self.allow(615)
+
+        self.assertEqual(throttle.wait(), 45)
+
+    def test_action_rate(self):
+        """ Test an action with its own rate is limited separately """
+        view = make_view(action='upload_image')
+        self.assertTrue(self.allow(600, view)[0])
+        self.assertFalse(self.allow(601, view)[0])
+
+        self.assertTrue(self.allow(602)[0])
+
+    def test_users_counted_separately(self):
+        """ Test each user & address has its own counter """
+        for i in range(4):
+            self.allow(600 + i)
+        user = MagicMock(pk=1, is_authenticated=True)
+
+        self.assertTrue(self.allow(605, request=MagicMock(user=user))[0])
+        self.assertFalse(self.allow(606)[0])
+
+    def test_unknown_scope_allowed(self):
+        """ Test views without a configured rate are not limited """
+        view = make_view(scope='other')
+
+        self.assertTrue(all(self.allow(600, view)[0] for i in range(10)))
+
+    @override_settings(THROTTLES_ENABLED=False)
+    def test_throttles_disabled(self):
+        """ Test nothing is limited with throttles turned off """
+        self.assertTrue(all(self.allow(600 + i)[0] for i in range(10)))
+
+
+@override_settings(THROTTLE_RATES={'token.post': '2/min'})
+class TokenThrottleTests(TestCase):
+    """ Test throttling token issuance """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_token_throttled(self):
+        """ Test too many token requests are refused """
+        client = APIClient()
+        payload = {'email': 'test@example.com', 'password': 'badpass'}
+        codes = [
+            client.post(reverse('user:token'), payload).status_code
+            for i in range(3)
+        ]
+
+        self.assertEqual(codes[:2], [status.HTTP_400_BAD_REQUEST] * 2)
+        self.assertEqual(codes[2], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_forwarded_for_spoofing(self):
+        """ Test a client cannot reset its bucket by sending its own
+            X-Forwarded-For, as nginx appends the real address """
+        client = APIClient()
+        payload = {'email': 'test@example.com', 'password': 'badpass'}
+        codes = [
+            client.post(
+                reverse('user:token'), payload,
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 203.0.113.7',
+            ).status_code
+            for i in range(3)
+        ]
+
+        self.assertEqual(codes[2], status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,108 @@
+"""
+Tests for core views
+"""
+import json
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import views
+from core.views import CachedSpectacularAPIView
+
+SCHEMA_URL = reverse('api-schema')
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class SchemaViewTests(SimpleTestCase):
+    """ Test serving the cached API schema. """
+
+    def setUp(self):
+        CachedSpectacularAPIView._schema_cache.clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        CachedSpectacularAPIView._schema_cache.clear()
+
+    def test_schema_has_etag(self):
+        """ Test the schema is served with an ETag. """
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'/api/recipe/recipes/', res.content)
+        self.assertTrue(res['ETag'])
+
+    def test_schema_not_modified(self):
+        """ Test revalidating with a matching ETag returns 304. """
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_schema_served_from_file(self):
+        """ Test the prebuilt schema file is served when configured. """
+        schema = {'openapi': '3.0.3', 'info': {'title': 'Prebuilt'}}
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as schema_file:
+            json.dump(schema, schema_file)
+            schema_file.flush()
+            with override_settings(SPECTACULAR_SCHEMA_FILE=schema_file.name):
+                res = self.client.get(
+                    SCHEMA_URL,
+                    HTTP_ACCEPT='application/json',
+                )
+
+        self.assertEqual(json.loads(res.content), schema)
+
+
+class HealthCheckTests(TestCase):
+    """ Test the liveness & readiness probes. """
+
+    def setUp(self):
+        views._readiness = (0, None, None)
+
+    def test_healthz(self):
+        """ Test the liveness probe does no I/O. """
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(ALLOWED_HOSTS=['example.com'])
+    def test_probes_skip_host_validation(self):
+        """ Test probes work with the load balancer's own Host header. """
+        res = self.client.get(HEALTHZ_URL, HTTP_HOST='10.0.0.5')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_readyz(self):
+        """ Test the readiness probe checks the database. """
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'database': 'ok', 'migrations': 'ok'})
+
+    def test_readyz_cached(self):
+        """ Test repeated probes reuse the last result. """
+        self.client.get(READYZ_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch('core.views.unapplied_migrations')
+    def test_readyz_pending_migrations(self, patched_unapplied):
+        """ Test the app is not ready while migrations are pending. """
+        patched_unapplied.return_value = [('core', False)]
+
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['migrations'], '1 pending')
@@ -0,0 +1,46 @@
+"""
+Tests for worker warmup
+"""
+import gc
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from core import warmup
+from core.models import Recipe
+from core.views import CachedSpectacularAPIView
+
+
+class WarmupTests(SimpleTestCase):
+    """ Test warming up a worker. """
+
+    def tearDown(self):
+        gc.unfreeze()
+
+    @patch.dict(CachedSpectacularAPIView._schema_cache, clear=True)
+    def test_warmup_renders_schema(self):
+        """ Test warmup leaves the rendered schema in the view's cache """
+        warmup.warmup()
+
+        self.assertTrue(CachedSpectacularAPIView._schema_cache)
+
+    def test_warmup_fills_model_caches(self):
+        """ Test warmup builds the field caches of the models """
+        warmup.warmup()
+
+        self.assertIn('_get_fields_cache', Recipe._meta.__dict__)
+        self.assertIn('fields_map', Recipe._meta.__dict__)
+
+    @patch('core.warmup.connections')
+    def test_warmup_connections(self, patched_connections):
+        """ Test inherited connections are closed & a new one opened """
+        inherited = [MagicMock(), MagicMock()]
+        patched_connections.all.return_value = inherited
+        default = patched_connections.__getitem__.return_value
+        default.settings_dict = {'CONN_MAX_AGE': 60}
+
+        warmup.warmup_connections()
+
+        for conn in inherited:
+            conn.close.assert_called_once()
+        default.ensure_connection.assert_called_once()
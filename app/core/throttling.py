@@ -0,0 +1,86 @@
+"""
+Rate limits shared by all workers
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """ Return (requests, seconds) of a rate such as '100/min'. """
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """ Limit each user, or each address for anonymous requests, to the
+        rate in THROTTLE_RATES of the view's throttle_scope.
+
+        A rate for '<scope>.<action>' takes precedence over the rate of
+        the scope, so the actions of a viewset can have their own limits.
+        Requests are counted in fixed windows with an atomic increment in
+        the shared cache, and the previous window is weighted by how much
+        of it still falls within the sliding window. Both windows are read
+        together in one round trip. """
+    timer = time.time
+
+    def get_scope(self, request, view):
+        """ Return the name of the rate for this request, if any. """
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return None
+        action = getattr(view, 'action', None) or request.method.lower()
+        if f'{scope}.{action}' in settings.THROTTLE_RATES:
+            return f'{scope}.{action}'
+        if scope in settings.THROTTLE_RATES:
+            return scope
+        return None
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return super().get_ident(request)
+
+    def increment(self, key, duration):
+        """ Atomically count a request & return the count of the window.
+        """
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The first request of the window creates the counter.
+            if cache.add(key, 1, duration * 2):
+                return 1
+            return cache.incr(key)
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLES_ENABLED:
+            return True
+        scope = self.get_scope(request, view)
+        if scope is None:
+            return True
+
+        num_requests, duration = parse_rate(settings.THROTTLE_RATES[scope])
+        now = self.timer()
+        window, elapsed = divmod(now, duration)
+        prefix = f'throttle:{scope}:{self.get_ident(request)}'
+
+        current_key = f'{prefix}:{int(window)}'
+        previous_key = f'{prefix}:{int(window) - 1}'
+        counts = cache.get_many([current_key, previous_key])
+        weighted = counts.get(previous_key, 0) * (1 - elapsed / duration)
+        self.wait_seconds = duration - elapsed
+
+        # Refused requests are not counted, so they cost one read.
+        if weighted + counts.get(current_key, 0) + 1 > num_requests:
+            return False
+        # Check the exact count again, in case other workers counted
+        # requests since the read.
+        current = self.increment(current_key, duration)
+        return weighted + current <= num_requests
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,120 @@
+"""
+Views for the core app
+"""
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from drf_spectacular.views import SpectacularAPIView
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from django.conf import settings
+from django.db import connection, DatabaseError
+from django.http import HttpResponse, JsonResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core.db import unapplied_migrations
+from core.metrics import render_metrics
+
+# (expiry, status, checks) of the last readiness check in this process.
+_readiness = (0, None, None)
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """ Serve the OpenAPI schema built once per process instead of
+        introspecting every view on each request. """
+    # Rendered schema & its ETag keyed by (language, media type).
+    _schema_cache = {}
+
+    def _load_schema(self, request):
+        """ Return the schema from the prebuilt file, or generate it. """
+        path = settings.SPECTACULAR_SCHEMA_FILE
+        if (path and os.path.exists(path)
+                and translation.get_language() == settings.LANGUAGE_CODE):
+            with open(path) as schema_file:
+                return json.load(schema_file)
+
+        generator = self.generator_class(
+            urlconf=self.urlconf,
+            api_version=self.api_version,
+        )
+        return generator.get_schema(request=request, public=self.serve_public)
+
+    def _get_schema_response(self, request):
+        key = (translation.get_language(), request.accepted_media_type)
+        if key not in self._schema_cache:
+            content = request.accepted_renderer.render(
+                self._load_schema(request),
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
+            etag = quote_etag(hashlib.sha1(content).hexdigest())
+            self._schema_cache[key] = (content, etag)
+
+        content, etag = self._schema_cache[key]
+        response = HttpResponse(
+            content,
+            content_type=request.accepted_media_type,
+        )
+        response['ETag'] = etag
+
+        # Swagger UI revalidates on every page load, answer with a 304
+        # when it already holds the current schema.
+        return get_conditional_response(request, etag=etag, response=response)
+
+
+def healthz(request):
+    """ Report the process is alive, without touching anything else. """
+    return HttpResponse('ok', content_type='text/plain')
+
+
+def check_readiness():
+    """ Check the database is reachable & fully migrated. """
+    checks = {'database': 'ok', 'migrations': 'ok'}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        pending = len(unapplied_migrations(connection))
+    except DatabaseError:
+        checks['database'] = 'unavailable'
+        checks['migrations'] = 'unknown'
+        return False, checks
+
+    if pending:
+        checks['migrations'] = f'{pending} pending'
+
+    return not pending, checks
+
+
+def readyz(request):
+    """ Report whether this process can serve traffic. The result is
+        reused for READYZ_CACHE_SECONDS to keep probes cheap. """
+    global _readiness
+    expires, ready, checks = _readiness
+    if time.monotonic() >= expires:
+        ready, checks = check_readiness()
+        _readiness = (
+            time.monotonic() + settings.READYZ_CACHE_SECONDS, ready, checks,
+        )
+
+    return JsonResponse(checks, status=200 if ready else 503)
+
+
+def metrics(request):
+    """ Expose the Prometheus metrics of all workers to scrapers sending
+        METRICS_TOKEN as a bearer token. Nothing is exposed without one
+        configured. """
+    token = settings.METRICS_TOKEN
+    given = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(
+        given.encode(), f'Bearer {token}'.encode(),
+    ):
+        response = HttpResponse('Unauthorized', status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
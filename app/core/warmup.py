@@ -0,0 +1,63 @@
+"""
+Warm up a worker before it accepts traffic
+"""
+import gc
+
+from django.apps import apps
+from django.db import connections
+from django.http import HttpRequest
+from django.urls import URLResolver, get_resolver, resolve, reverse
+
+
+def _iter_patterns(resolver):
+    """ Yield every URL pattern below resolver, compiling its regex. """
+    for pattern in resolver.url_patterns:
+        # Both attributes are computed & cached on first access.
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            pattern.reverse_dict
+            yield from _iter_patterns(pattern)
+        else:
+            yield pattern
+
+
+def _warm_models():
+    """ Fill the field caches of every model's _meta. """
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta._forward_fields_map
+        model._meta.fields_map
+
+
+def _warm_schema():
+    """ Render the OpenAPI schema into the schema view's cache. """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse('api-schema')
+    resolve(request.path).func(request)
+
+
+def warmup():
+    """ Fill the URL resolver, model metadata & schema caches, which are
+        shared by every worker forked after this runs. """
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for _ in _iter_patterns(resolver):
+        pass
+    _warm_models()
+    _warm_schema()
+
+    # Move everything created so far out of the collector's reach, so
+    # forked workers do not copy these pages when the GC touches them.
+    gc.freeze()
+
+
+def warmup_connections():
+    """ Drop connections inherited from the parent process and open a
+        fresh persistent one. Must run in each worker after the fork. """
+    for conn in connections.all():
+        conn.close()
+
+    conn = connections['default']
+    if conn.settings_dict['CONN_MAX_AGE']:
+        conn.ensure_connection()
@@ -0,0 +1,11 @@
+"""
+Gunicorn config for serving the ASGI app
+"""
+
+
+def post_fork(server, worker):
+    """ Give each worker its own database connection, the app was
+        loaded in the master with --preload. """
+    from core.warmup import warmup_connections
+
+    warmup_connections()
@@ -2,13 +2,18 @@
 Tests for recipe APIs.
 """
 from decimal import Decimal
+from unittest.mock import patch
 import tempfile
 import os
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.db.utils import ConnectionDoesNotExist
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -19,13 +24,18 @@ from core.models import (
     Tag,
     Ingredient,
 )
+from core.images import evict_renditions
+from core.routers import read_from
+from core.testing import QueryBudgetMixin
 
+from recipe.similar import similar_recipes
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
 )
 
 RECIPES_URL = reverse('recipe:recipe-list')
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
 
 
 # The reason this "detail-url is a function and not a variable like
@@ -35,11 +45,26 @@ def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
+def clone_url(recipe_id):
+    """ Create and return a recipe clone URL. """
+    return reverse('recipe:recipe-clone', args=[recipe_id])
+
+
+def similar_url(recipe_id):
+    """ Create and return a similar recipes URL. """
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
 def image_upload_url(recipe_id):
     """ Create and return a recipe detail URL. """
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def image_rendition_url(recipe_id, width):
+    """ Create and return a resized recipe image URL. """
+    return reverse('recipe:recipe-image-rendition', args=[recipe_id, width])
+
+
 def create_recipe(user, **params):
     """ Create and return a sample recipe """
     defaults = {
@@ -73,7 +98,7 @@ class PublicRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeAPItests(TestCase):
+class PrivateRecipeAPItests(QueryBudgetMixin, TestCase):
     """ Test authenticated API requests """
 
     def setUp(self):
@@ -195,7 +220,39 @@ class PrivateRecipeAPItests(TestCase):
         res = self.client.delete(url)
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        # The recipe is hidden at once & purged in the background.
+        recipe.refresh_from_db()
+        self.assertIsNotNone(recipe.deleted_at)
+        self.assertEqual(
+            self.client.get(url).status_code, status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(self.client.get(RECIPES_URL).data, [])
+
+    def test_deleted_recipe_excluded(self):
+        """ Test deleted recipes are left out of stats, similar recipes &
+            shopping lists """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        deleted = create_recipe(user=self.user)
+        deleted.tags.add(tag)
+        deleted.ingredients.add(salt)
+        self.client.delete(detail_url(deleted.id))
+
+        res = self.client.get(similar_url(recipe.id))
+        self.assertEqual(res.data, [])
+        res = self.client.get(
+            SHOPPING_LIST_URL, {'recipes': f'{recipe.id},{deleted.id}'},
+        )
+        self.assertEqual(res.data, [])
+        res = self.client.get(reverse('recipe:stats'))
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(res.data['top_tags'][0]['count'], 1)
+        res = self.client.get(
+            reverse('recipe:ingredient-list'), {'assigned_only': 1},
+        )
+        self.assertEqual(res.data, [])
 
     def test_delete_other_users_recipe_error(self):
         """ Test trying to delete other users recipe throws error """
@@ -433,6 +490,505 @@ class PrivateRecipeAPItests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_list_recipes_query_budget(self):
+        """ Test listing recipes does not query per recipe. """
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            )
+
+        with self.assertQueryBudget(max_queries=3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 5)
+
+    def test_filter_by_price_and_time(self):
+        """ Test filtering recipes by price & time ranges """
+        r1 = create_recipe(user=self.user, price='3.00', time_minutes=10)
+        r2 = create_recipe(user=self.user, price='8.00', time_minutes=20)
+        create_recipe(user=self.user, price='12.00', time_minutes=20)
+        create_recipe(user=self.user, price='8.00', time_minutes=90)
+
+        params = {'price_min': '2.50', 'price_max': '8', 'time_max': 30}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r2.id, r1.id])
+
+    def test_invalid_filter_error(self):
+        """ Test invalid filters & orderings are rejected """
+        for params in [
+            {'price_min': 'cheap'},
+            {'ordering': 'description'},
+            {'ordering': 'price,-price'},
+            # Only single keys run along the (user, key, id) indexes.
+            {'ordering': 'price,title'},
+            {'ordering': '-price,title'},
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_ignored_on_detail(self):
+        """ Test list filters on a detail request are not validated """
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(detail_url(recipe.id), {'ordering': 'bogus'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], recipe.id)
+
+    def test_ordering_ties_broken_by_id(self):
+        """ Test ordering recipes by a key, with ties in id order of the
+            same direction """
+        r1 = create_recipe(user=self.user, price='5', time_minutes=10)
+        r2 = create_recipe(user=self.user, price='5', time_minutes=30)
+        r3 = create_recipe(user=self.user, price='2', time_minutes=60)
+
+        for ordering, expected in [
+            ('price', [r3.id, r1.id, r2.id]),
+            ('-price', [r2.id, r1.id, r3.id]),
+        ]:
+            with self.subTest(ordering=ordering):
+                res = self.client.get(RECIPES_URL, {'ordering': ordering})
+
+                self.assertEqual([r['id'] for r in res.data], expected)
+
+    def test_keyset_pagination(self):
+        """ Test paging through orderings with repeated values """
+        recipes = [
+            create_recipe(
+                user=self.user,
+                title=f'Recipe {i % 3}',
+                price=Decimal(i % 2),
+            )
+            for i in range(7)
+        ]
+        for ordering, key, seek in [
+            ('-price', lambda r: (-r.price, -r.id), ') < ('),
+            ('title', lambda r: (r.title, r.id), ') > ('),
+        ]:
+            with self.subTest(ordering=ordering):
+                expected = [r.id for r in sorted(recipes, key=key)]
+
+                ids = []
+                url = f'{RECIPES_URL}?ordering={ordering}&page_size=3'
+                while url:
+                    with CaptureQueriesContext(connection) as queries:
+                        res = self.client.get(url)
+                    self.assertEqual(res.status_code, status.HTTP_200_OK)
+                    self.assertLessEqual(len(res.data['results']), 3)
+                    if ids:
+                        self.assertIn(seek, queries[0]['sql'])
+                    ids += [r['id'] for r in res.data['results']]
+                    url = res.data['next']
+
+                self.assertEqual(ids, expected)
+
+    def test_filter_with_facets(self):
+        """ Test filtering returns the tag & ingredient counts of the
+            matching recipes """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        r1 = create_recipe(user=self.user, title='Tofu Stir Fry')
+        r1.tags.add(vegan, quick)
+        r1.ingredients.add(tofu)
+        r2 = create_recipe(user=self.user, title='Lentil Soup')
+        r2.tags.add(vegan)
+        r3 = create_recipe(user=self.user, title='Steak')
+        r3.tags.add(quick)
+
+        params = {'tags': f'{vegan.id}', 'facets': 1}
+        with self.assertQueryBudget(max_queries=5):
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [r2.id, r1.id],
+        )
+        self.assertEqual(res.data['facets']['tags'], [
+            {'id': vegan.id, 'name': 'Vegan', 'count': 2},
+            {'id': quick.id, 'name': 'Quick', 'count': 1},
+        ])
+        self.assertEqual(res.data['facets']['ingredients'], [
+            {'id': tofu.id, 'name': 'Tofu', 'count': 1},
+        ])
+
+    def test_facets_with_pagination(self):
+        """ Test facets count every matching recipe, not just the page """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(3):
+            create_recipe(user=self.user).tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, {'facets': 1, 'page_size': 2})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+        self.assertEqual(res.data['facets']['tags'][0]['count'], 3)
+
+    def test_facets_flag_values(self):
+        """ Test the facets flag takes the usual boolean spellings and
+            rejects anything else """
+        for value, included in [
+            ('1', True), ('true', True), ('yes', True),
+            ('0', False), ('false', False),
+        ]:
+            with self.subTest(facets=value):
+                res = self.client.get(RECIPES_URL, {'facets': value})
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    isinstance(res.data, dict) and 'facets' in res.data,
+                    included,
+                )
+
+        res = self.client.get(RECIPES_URL, {'facets': 'maybe'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(
+        SIMILAR_RECIPES_TAG_WEIGHT=1,
+        SIMILAR_RECIPES_INGREDIENT_WEIGHT=2,
+    )
+    def test_similar_recipes(self):
+        """ Test ranking recipes by weighted shared tags & ingredients """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        recipe = create_recipe(user=self.user, title='Tofu Rice Bowl')
+        recipe.tags.add(vegan, quick)
+        recipe.ingredients.add(tofu, rice)
+        # Shares everything but a tag: 5 / 6.
+        close = create_recipe(user=self.user, title='Tofu Fried Rice')
+        close.tags.add(vegan)
+        close.ingredients.add(tofu, rice)
+        # Shares a tag only: 1 / 6.
+        distant = create_recipe(user=self.user, title='Quick Toast')
+        distant.tags.add(quick)
+        create_recipe(user=self.user, title='Unrelated')
+        other_user = create_user(email='other@example.com', password='pw')
+        create_recipe(user=other_user).tags.add(vegan, quick)
+
+        with self.assertQueryBudget(max_queries=5):
+            res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data], [close.id, distant.id],
+        )
+        self.assertAlmostEqual(res.data[0]['similarity'], 5 / 6)
+        self.assertAlmostEqual(res.data[1]['similarity'], 1 / 6)
+
+    @override_settings(SIMILAR_RECIPES_MAX_FEATURE_USES=2)
+    def test_similar_recipes_common_features(self):
+        """ Test common tags do not find candidates, but still count in
+            the score of recipes found by a rarer ingredient """
+        common = Tag.objects.create(user=self.user, name='Dinner')
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(common)
+        recipe.ingredients.add(tofu)
+        close = create_recipe(user=self.user)
+        close.tags.add(common)
+        close.ingredients.add(tofu)
+        create_recipe(user=self.user).tags.add(common)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual([r['id'] for r in res.data], [close.id])
+        self.assertAlmostEqual(res.data[0]['similarity'], 1)
+
+    @override_settings(
+        SIMILAR_RECIPES_TAG_WEIGHT=0,
+        SIMILAR_RECIPES_INGREDIENT_WEIGHT=0,
+    )
+    def test_similar_recipes_zero_weights(self):
+        """ Test zero weights find no similar recipes instead of failing
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        create_recipe(user=self.user).tags.add(tag)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_similar_recipes_read_from_routed_database(self):
+        """ Test similar recipes are ranked where reads are routed """
+        recipe = create_recipe(user=self.user)
+
+        with read_from('replica1'):
+            with self.assertRaises(ConnectionDoesNotExist):
+                similar_recipes(recipe, 10)
+
+    def test_similar_recipes_limit(self):
+        """ Test limiting the number of similar recipes """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        for i in range(3):
+            create_recipe(user=self.user).tags.add(tag)
+
+        res = self.client.get(similar_url(recipe.id), {'limit': 2})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_similar_recipes_other_users_recipe(self):
+        """ Test another user's recipe is not found """
+        other_user = create_user(email='other@example.com', password='pw')
+        recipe = create_recipe(user=other_user)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_shopping_list(self):
+        """ Test listing the ingredients of several recipes once each """
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        kale = Ingredient.objects.create(user=self.user, name='Kale')
+        r1 = create_recipe(user=self.user)
+        r1.ingredients.add(salt, rice)
+        r2 = create_recipe(user=self.user)
+        r2.ingredients.add(salt)
+        create_recipe(user=self.user).ingredients.add(kale)
+        other_user = create_user(email='other@example.com', password='pw')
+        r4 = create_recipe(user=other_user)
+        r4.ingredients.add(salt)
+
+        params = {'recipes': f'{r1.id},{r2.id},{r4.id}'}
+        with self.assertQueryBudget(max_queries=1):
+            res = self.client.get(SHOPPING_LIST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': rice.id, 'name': 'Rice', 'count': 1},
+            {'id': salt.id, 'name': 'Salt', 'count': 2},
+        ])
+
+    def test_shopping_list_requires_recipes(self):
+        """ Test the shopping list needs a list of recipe IDs """
+        for params in [{}, {'recipes': 'one,two'}]:
+            res = self.client.get(SHOPPING_LIST_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_clone_recipe(self):
+        """ Test cloning a recipe with its tags, ingredients & image """
+        recipe = create_recipe(
+            user=self.user,
+            title='Thai Curry',
+            image='uploads/recipe/curry.jpg',
+            image_width=640,
+        )
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Rice', 'Coconut Milk']
+        ]
+        recipe.tags.add(tag)
+        recipe.ingredients.add(*ingredients)
+
+        res = self.client.post(clone_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        clone = Recipe.objects.get(id=res.data['id'])
+        self.assertNotEqual(clone.id, recipe.id)
+        self.assertEqual(clone.user, self.user)
+        self.assertEqual(clone.title, 'Thai Curry')
+        self.assertEqual(clone.image.name, recipe.image.name)
+        self.assertEqual(clone.image_width, 640)
+        self.assertEqual(list(clone.tags.all()), [tag])
+        self.assertEqual(
+            set(clone.ingredients.all()), set(ingredients),
+        )
+        self.assertEqual(len(res.data['ingredients']), 2)
+        self.assertEqual(recipe.ingredients.count(), 2)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_clone_other_users_recipe_error(self):
+        """ Test cloning another user's recipe is not found """
+        other_user = create_user(email='other@example.com', password='pw')
+        recipe = create_recipe(user=other_user)
+
+        res = self.client.post(clone_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_keyset_pagination_invalid_cursor(self):
+        """ Test an invalid cursor returns not found """
+        res = self.client.get(RECIPES_URL, {'cursor': 'bogus'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class IdempotencyTests(QueryBudgetMixin, TestCase):
+    """ Test retrying requests with an Idempotency-Key """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+            'tags': [{'name': 'Thai'}],
+        }
+
+    def test_create_retry_replayed(self):
+        """ Test a retried create replays the first response without
+            writing to the database """
+        first = self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+        with self.assertQueryBudget(max_queries=0):
+            retry = self.client.post(
+                RECIPES_URL, self.payload, format='json',
+                HTTP_IDEMPOTENCY_KEY='key-1',
+            )
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+
+    def test_different_keys_and_users(self):
+        """ Test keys are separate for each key & each user """
+        self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+        self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-2',
+        )
+        other_user = create_user(email='other@example.com', password='pw')
+        self.client.force_authenticate(other_user)
+        self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Recipe.objects.filter(user=other_user).count(), 1)
+
+    def test_key_reused_for_other_body_error(self):
+        """ Test reusing a key with a different body is rejected """
+        self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+        self.payload['title'] = 'Another recipe'
+
+        res = self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+
+        self.assertEqual(
+            res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_without_key_not_replayed(self):
+        """ Test requests without a key always run """
+        self.client.post(RECIPES_URL, self.payload, format='json')
+        self.client.post(RECIPES_URL, self.payload, format='json')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_update_retry_replayed(self):
+        """ Test a retried partial update is replayed """
+        recipe = create_recipe(user=self.user, title='Original')
+        url = detail_url(recipe.id)
+        self.client.patch(
+            url, {'title': 'First'}, HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+        Recipe.objects.filter(id=recipe.id).update(title='Changed')
+
+        res = self.client.patch(
+            url, {'title': 'First'}, HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+
+        self.assertEqual(res.data['title'], 'First')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Changed')
+
+    def test_key_in_progress_conflict(self):
+        """ Test a retry while the first request runs is rejected """
+        first = self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-1',
+        )
+        key = f'idempotency:{self.user.pk}:POST:{RECIPES_URL}:key-2'
+        cache.set(key, {'status': None})
+
+        res = self.client.post(
+            RECIPES_URL, self.payload, format='json',
+            HTTP_IDEMPOTENCY_KEY='key-2',
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_LOCK_SECONDS=30, IDEMPOTENCY_KEY_TTL=900)
+    def test_claim_expires_before_response(self):
+        """ Test a key is only held briefly until its response is stored,
+            so a crashed request does not block retries for long """
+        with patch('core.idempotency.cache') as patched_cache:
+            patched_cache.add.return_value = True
+            self.client.post(
+                RECIPES_URL, self.payload, format='json',
+                HTTP_IDEMPOTENCY_KEY='key-1',
+            )
+
+        self.assertEqual(patched_cache.add.call_args[0][2], 30)
+        self.assertEqual(patched_cache.set.call_args[0][2], 900)
+
+    def test_claim_released_after_add_retried(self):
+        """ Test a key released between a failed claim & reading it is
+            claimed again, and the request runs once """
+        with patch('core.idempotency.cache') as patched_cache:
+            patched_cache.add.side_effect = [False, True]
+            patched_cache.get.return_value = None
+            res = self.client.post(
+                RECIPES_URL, self.payload, format='json',
+                HTTP_IDEMPOTENCY_KEY='key-1',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(patched_cache.add.call_count, 2)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_claim_never_taken_conflict(self):
+        """ Test the request is not run without claiming its key """
+        with patch('core.idempotency.cache') as patched_cache:
+            patched_cache.add.return_value = False
+            patched_cache.get.return_value = None
+            res = self.client.post(
+                RECIPES_URL, self.payload, format='json',
+                HTTP_IDEMPOTENCY_KEY='key-1',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Recipe.objects.exists())
+        patched_cache.set.assert_not_called()
+
 
 class ImageUploadTests(TestCase):
     """ Tests for image upload API. """
@@ -473,6 +1029,64 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_retry_replayed(self):
+        """ Test retrying an upload with the same file replays it, and
+            another file under the same key is rejected """
+        cache.clear()
+        url = image_upload_url(self.recipe.id)
+        codes = []
+        for color in ['red', 'red', 'blue']:
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+                Image.new('RGB', (10, 10), color).save(image_file, 'JPEG')
+                image_file.seek(0)
+                res = self.client.post(
+                    url, {'image': image_file}, format='multipart',
+                    HTTP_IDEMPOTENCY_KEY='upload-1',
+                )
+                codes.append(res.status_code)
+
+        self.assertEqual(codes, [200, 200, 422])
+
+    def test_upload_image_stores_metadata(self):
+        """ Test uploading an image stores its dimensions & size. """
+        url = image_upload_url(self.recipe.id)
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', (40, 20))
+            img.save(image_file, format='JPEG')
+            image_size = image_file.tell()
+            image_file.seek(0)
+            payload = {'image': image_file}
+            res = self.client.post(url, payload, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.recipe.image_width, 40)
+        self.assertEqual(self.recipe.image_height, 20)
+        self.assertEqual(self.recipe.image_size, image_size)
+        self.assertTrue(
+            self.recipe.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        self.assertEqual(res.data['image_width'], 40)
+
+    def test_update_cannot_change_image(self):
+        """ Test the detail endpoint leaves the image & its metadata alone
+        """
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            res = self.client.patch(
+                detail_url(self.recipe.id),
+                {'image': image_file, 'title': 'New title'},
+                format='multipart',
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.recipe.title, 'New title')
+        self.assertFalse(self.recipe.image)
+        self.assertIsNone(self.recipe.image_width)
+
     def test_upload_image_bad_request(self):
         """ Test uploading invalid image. """
         url = image_upload_url(self.recipe.id)
@@ -480,3 +1094,98 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImageRenditionTests(TestCase):
+    """ Tests for the resized image API. """
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name,
+        )
+        self.settings_override.enable()
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (400, 200)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': image_file},
+                format='multipart',
+            )
+        self.recipe.refresh_from_db()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def test_get_rendition(self):
+        """ Test requesting a resized image generates & caches it. """
+        res = self.client.get(image_rendition_url(self.recipe.id, 160))
+        content = b''.join(res.streaming_content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        cached = os.path.join(
+            self.media_root.name, 'cache', 'recipe', '160',
+            os.path.basename(self.recipe.image.name),
+        )
+        with Image.open(cached) as img:
+            self.assertEqual(img.size, (160, 80))
+        with open(cached, 'rb') as cached_file:
+            self.assertEqual(cached_file.read(), content)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/internal/media/')
+    def test_get_rendition_accel_redirect(self):
+        """ Test the rendition is handed to the proxy when configured. """
+        res = self.client.get(image_rendition_url(self.recipe.id, 320))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            '/internal/media/cache/recipe/320/'
+            f'{os.path.basename(self.recipe.image.name)}',
+        )
+
+    def test_get_rendition_width_not_allowed(self):
+        """ Test requesting a width outside the allowlist fails. """
+        res = self.client.get(image_rendition_url(self.recipe.id, 333))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rendition_cache_evicts_least_recently_used(self):
+        """ Test the cache is trimmed to its byte budget. """
+        self.client.get(image_rendition_url(self.recipe.id, 160)).close()
+        cache_dir = os.path.join(self.media_root.name, 'cache', 'recipe')
+        oldest = os.path.join(
+            cache_dir, '160', os.path.basename(self.recipe.image.name),
+        )
+        os.utime(oldest, (0, 0))
+
+        with override_settings(RECIPE_IMAGE_CACHE_MAX_BYTES=1):
+            self.client.get(image_rendition_url(self.recipe.id, 320)).close()
+
+        self.assertFalse(os.path.exists(oldest))
+
+    def test_rendition_cache_walked_only_over_budget(self):
+        """ Test the cache directory is only walked when the running total
+            is unknown or over budget. """
+        with patch(
+            'core.images.evict_renditions', wraps=evict_renditions,
+        ) as patched_evict:
+            for width in [160, 320, 640]:
+                self.client.get(
+                    image_rendition_url(self.recipe.id, width),
+                ).close()
+            self.assertEqual(patched_evict.call_count, 1)
+
+            with override_settings(RECIPE_IMAGE_CACHE_MAX_BYTES=1):
+                self.client.get(
+                    image_rendition_url(self.recipe.id, 1280),
+                ).close()
+            self.assertEqual(patched_evict.call_count, 2)
@@ -0,0 +1,145 @@
+"""
+Tests for the recipe statistics API.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.utils import ConnectionDoesNotExist
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from core.routers import read_from
+from core.testing import QueryBudgetMixin
+from recipe.stats import compute_stats
+
+STATS_URL = reverse('recipe:stats')
+
+
+def create_recipe(user, **params):
+    """ Create and return a sample recipe """
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicStatsAPITests(TestCase):
+    """ Test unauthenticated API requests """
+
+    def test_auth_required(self):
+        """ Test auth is required to retrieve statistics """
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(RECIPE_STATS_TOP=2)
+class PrivateStatsAPITests(QueryBudgetMixin, TestCase):
+    """ Test authenticated API requests """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stats(self):
+        """ Test the statistics summarize the user's recipes """
+        r1 = create_recipe(self.user, price='2.00', time_minutes=10)
+        r2 = create_recipe(self.user, price='5.00', time_minutes=20)
+        r3 = create_recipe(
+            self.user, price='8.00', time_minutes=60, image='a.jpg',
+        )
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        Tag.objects.create(user=self.user, name='Unused')
+        r1.tags.add(vegan, quick, spicy)
+        r2.tags.add(vegan, quick)
+        r3.tags.add(vegan)
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        r2.ingredients.add(salt)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(other, price='99.00')
+
+        with self.assertQueryBudget(max_queries=1):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 3)
+        self.assertEqual(res.data['price_avg'], '5.00')
+        self.assertEqual(res.data['price_min'], '2.00')
+        self.assertEqual(res.data['price_max'], '8.00')
+        self.assertEqual(res.data['time_minutes_avg'], 30)
+        self.assertEqual(res.data['time_minutes_min'], 10)
+        self.assertEqual(res.data['time_minutes_max'], 60)
+        self.assertEqual(res.data['recipes_without_image'], 2)
+        self.assertEqual(res.data['top_tags'], [
+            {'id': vegan.id, 'name': 'Vegan', 'count': 3},
+            {'id': quick.id, 'name': 'Quick', 'count': 2},
+        ])
+        self.assertEqual(res.data['top_ingredients'], [
+            {'id': salt.id, 'name': 'Salt', 'count': 1},
+        ])
+
+    def test_stats_without_recipes(self):
+        """ Test the statistics of a user without recipes """
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['price_avg'])
+        self.assertEqual(res.data['recipes_without_image'], 0)
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_stats_cached(self):
+        """ Test the statistics are served from cache """
+        create_recipe(self.user)
+        self.client.get(STATS_URL)
+
+        with self.assertQueryBudget(max_queries=0):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+
+    def test_stats_invalidated_on_write(self):
+        """ Test changing recipes, tags or ingredients refreshes the cache
+        """
+        recipe = create_recipe(self.user)
+        self.client.get(STATS_URL)
+
+        create_recipe(self.user)
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['recipe_count'], 2)
+
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['top_tags'][0]['count'], 1)
+
+        tag.delete()
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_stats_read_from_routed_database(self):
+        """ Test the statistics are computed where reads are routed """
+        with read_from('replica1'):
+            with self.assertRaises(ConnectionDoesNotExist):
+                compute_stats(self.user.id)
@@ -11,6 +11,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
+from core.testing import QueryBudgetMixin
 
 from recipe.serializers import TagSerializer
 
@@ -40,7 +41,7 @@ class PublicTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateTagsApiTests(TestCase):
+class PrivateTagsApiTests(QueryBudgetMixin, TestCase):
     """ Test authenticated API requests. """
 
     def setUp(self):
@@ -137,3 +138,13 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_list_tags_query_budget(self):
+        """ Test listing tags takes a single query. """
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        with self.assertQueryBudget(max_queries=1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
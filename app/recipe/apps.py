@@ -1,6 +1,26 @@
 from django.apps import AppConfig
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
 
 
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        from core.models import Recipe, Tag, Ingredient
+        from core.purge import purged
+        from recipe import stats
+
+        # Any change to a user's recipes, tags or ingredients makes their
+        # cached statistics stale.
+        for model in [Recipe, Tag, Ingredient]:
+            post_save.connect(stats.invalidate_stats, sender=model)
+            post_delete.connect(stats.invalidate_stats, sender=model)
+        for through in [Recipe.tags.through, Recipe.ingredients.through]:
+            m2m_changed.connect(stats.invalidate_stats, sender=through)
+        # The purge deletes in batches, invalidating once per batch.
+        purged.connect(stats.invalidate_purged_stats)
@@ -0,0 +1,35 @@
+"""
+Copy recipes on the server
+"""
+from django.db import connections, transaction
+
+from core.models import Recipe
+from recipe.stats import invalidate_stats
+
+
+def clone_recipe(recipe, using='default'):
+    """ Return a copy of recipe with the same tags & ingredients. The copy
+        shares the image file of recipe instead of storing it again. """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    with transaction.atomic(using=using):
+        clone = Recipe.objects.using(using).get(pk=recipe.pk)
+        clone.pk = None
+        clone._state.adding = True
+        clone.save(using=using)
+
+        # Copy the links inside the database rather than one at a time.
+        with connection.cursor() as cursor:
+            for field in [Recipe.tags.field, Recipe.ingredients.field]:
+                table = qn(field.m2m_db_table())
+                source = qn(field.m2m_column_name())
+                target = qn(field.m2m_reverse_name())
+                cursor.execute(
+                    f'INSERT INTO {table} ({source}, {target}) '
+                    f'SELECT %s, {target} FROM {table} WHERE {source} = %s',
+                    [clone.pk, recipe.pk],
+                )
+
+    # Raw inserts send no m2m_changed signal.
+    invalidate_stats(Recipe, clone)
+    return clone
@@ -0,0 +1,151 @@
+"""
+Pagination for the Recipe APIs
+"""
+import base64
+import json
+
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """ Page through a list by the values of its ordering keys, so every
+        page is an index range scan however deep the client goes. Lists
+        are only paginated when the client asks for a page_size or passes
+        a cursor. """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        """ Return the requested page size, or None to not paginate. """
+        params = request.query_params
+        if self.page_size_query_param in params:
+            try:
+                size = int(params[self.page_size_query_param])
+            except ValueError:
+                return self.page_size
+            return min(max(size, 1), self.max_page_size)
+        if self.cursor_query_param in params:
+            return self.page_size
+        return None
+
+    def get_keys(self, queryset):
+        """ Return (field, descending) for each key the list is ordered by.
+        """
+        return [
+            (key.lstrip('-'), key.startswith('-'))
+            for key in queryset.query.order_by
+        ]
+
+    def encode_cursor(self, obj):
+        """ Return the cursor pointing after obj. """
+        values = [str(getattr(obj, field)) for field, _ in self.keys]
+        return base64.urlsafe_b64encode(
+            json.dumps(values).encode()
+        ).decode()
+
+    def decode_cursor(self, cursor, model):
+        """ Return the key values of a cursor. """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.keys):
+                raise ValueError
+            return [
+                model._meta.get_field(field).to_python(value)
+                for (field, _), value in zip(self.keys, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def after(self, queryset, values):
+        """ Return the filter for the rows ordered after the given key
+            values. Every key runs the same way, so that is the row
+            comparison (a, b) > (x, y), which the composite index seeks to
+            directly. """
+        connection = connections[queryset.db]
+        quote = connection.ops.quote_name
+        table = quote(queryset.model._meta.db_table)
+        fields = [
+            queryset.model._meta.get_field(field) for field, _ in self.keys
+        ]
+        columns = ', '.join(f'{table}.{quote(f.column)}' for f in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        operator = '<' if self.keys[0][1] else '>'
+        return RawSQL(
+            f'({columns}) {operator} ({placeholders})',
+            [
+                field.get_db_prep_value(value, connection)
+                for field, value in zip(fields, values)
+            ],
+            output_field=BooleanField(),
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if self.page_size is None:
+            return None
+
+        self.request = request
+        self.keys = self.get_keys(queryset)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor, queryset.model)
+            queryset = queryset.filter(self.after(queryset, values))
+
+        # Fetch one extra row to know whether there is a next page.
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
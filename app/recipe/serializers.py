@@ -3,6 +3,7 @@ Serializers for Recipe APIs
 """
 
 from rest_framework import serializers
+from core.images import image_metadata
 from core.models import (
     Recipe,
     Tag,
@@ -107,10 +108,27 @@ class RecipeSerializer(serializers.ModelSerializer):
         return instance
 
 
+class SimilarRecipeSerializer(RecipeSerializer):
+    """ Serializer for a recipe ranked by similarity to another. """
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['similarity']
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """ Serializer for recipe detail view. """
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_width', 'image_height',
+            'image_size', 'image_placeholder',
+        ]
+        # Images are only set through upload_image, which also stores
+        # their metadata.
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + [
+            'image', 'image_width', 'image_height', 'image_size',
+            'image_placeholder',
+        ]
 
 
 # This is implemented as a separate class since when images
@@ -120,7 +138,73 @@ class RecipeImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
+        fields = [
+            'id', 'image', 'image_width', 'image_height', 'image_size',
+            'image_placeholder',
+        ]
+        read_only_fields = [
+            'id', 'image_width', 'image_height', 'image_size',
+            'image_placeholder',
+        ]
         # add images as a required field.
         extra_kwargs = {'image': {'required': 'True'}}
+
+    def update(self, instance, validated_data):
+        """ Store the image along with its metadata. """
+        # The uploaded file is still in memory (or a temp file) here,
+        # so this is the cheapest point to read its dimensions.
+        validated_data.update(image_metadata(validated_data['image']))
+
+        return super().update(instance, validated_data)
+
+
+class RecipeFilterSerializer(serializers.Serializer):
+    """ Serializer for the filters & ordering of the recipe list. """
+    # Each of these has a composite index with user_id on Recipe.
+    ORDERING_FIELDS = ['id', 'price', 'time_minutes', 'title']
+
+    price_min = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False,
+    )
+    price_max = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False,
+    )
+    time_max = serializers.IntegerField(required=False)
+    facets = serializers.BooleanField(required=False, default=False)
+    ordering = serializers.CharField(required=False, default='-id')
+
+    def validate_ordering(self, value):
+        """ Return the ordering as a list of keys, ending with the id in
+            the same direction so that the order is unique and runs
+            along one of the indexes. """
+        name = value.strip().lstrip('-')
+        if name not in self.ORDERING_FIELDS:
+            raise serializers.ValidationError(
+                f'Cannot order by {value.strip()!r}, order by one of: '
+                + ', '.join(self.ORDERING_FIELDS)
+            )
+        prefix = '-' if value.strip().startswith('-') else ''
+        if name == 'id':
+            return [f'{prefix}id']
+        return [f'{prefix}{name}', f'{prefix}id']
+
+
+class UsageSerializer(serializers.Serializer):
+    """ Serializer for the number of recipes using a tag or ingredient. """
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """ Serializer for the recipe statistics of a user. """
+    recipe_count = serializers.IntegerField()
+    price_avg = serializers.DecimalField(max_digits=7, decimal_places=2)
+    price_min = serializers.DecimalField(max_digits=5, decimal_places=2)
+    price_max = serializers.DecimalField(max_digits=5, decimal_places=2)
+    time_minutes_avg = serializers.FloatField()
+    time_minutes_min = serializers.IntegerField()
+    time_minutes_max = serializers.IntegerField()
+    recipes_without_image = serializers.IntegerField()
+    top_tags = UsageSerializer(many=True)
+    top_ingredients = UsageSerializer(many=True)
@@ -0,0 +1,94 @@
+"""
+Similar recipes by shared tags & ingredients
+"""
+from django.conf import settings
+from django.db import connections, router
+
+from core.models import Recipe
+
+
+def similar_recipes(recipe, limit, using=None):
+    """ Return (id, score) of the other recipes of the owner of recipe
+        with the highest weighted Jaccard similarity, best first.
+
+        The through tables act as the inverted index: only recipes which
+        share a tag or an ingredient with recipe are ever looked at, and
+        tags & ingredients on very many recipes are not used to find
+        them. The best candidates by those shared features are then
+        scored on all their tags & ingredients in one grouped pass. """
+    using = using or router.db_for_read(Recipe)
+    qn = connections[using].ops.quote_name
+    tags = qn(Recipe.tags.through._meta.db_table)
+    ingredients = qn(Recipe.ingredients.through._meta.db_table)
+    # These are numbers, so they are safe to write into the SQL.
+    tag_weight = float(settings.SIMILAR_RECIPES_TAG_WEIGHT)
+    ingredient_weight = float(settings.SIMILAR_RECIPES_INGREDIENT_WEIGHT)
+    max_uses = int(settings.SIMILAR_RECIPES_MAX_FEATURE_USES)
+    max_candidates = int(settings.SIMILAR_RECIPES_MAX_CANDIDATES)
+
+    def links(where, columns=''):
+        """ SQL for the (recipe_id, kind, feature_id, weight) rows of the
+            tags & ingredients matching where, x being the link table.
+            {feature}, {table} & {kind} in where and columns are filled in
+            for each. """
+        parts = []
+        for kind, table, feature, weight in [
+            (0, tags, 'tag_id', tag_weight),
+            (1, ingredients, 'ingredient_id', ingredient_weight),
+        ]:
+            names = {'feature': feature, 'table': table, 'kind': kind}
+            parts.append(f'''
+                SELECT x.recipe_id, {kind} AS kind,
+                       x.{feature} AS feature_id, {weight} AS weight
+                       {columns.format(**names)}
+                FROM {table} x WHERE {where.format(**names)}
+            ''')
+        return 'UNION ALL'.join(parts)
+
+    # EXISTS with an OFFSET stops counting the uses of a feature as soon
+    # as it is known to be common.
+    source = links('x.recipe_id = %s', f''',
+        CASE WHEN EXISTS (
+            SELECT 1 FROM {{table}} c WHERE c.{{feature}} = x.{{feature}}
+            LIMIT 1 OFFSET {max_uses}
+        ) THEN 1 ELSE 0 END AS common
+    ''')
+    sql = f'''
+        WITH source AS ({source}),
+        candidates AS (
+            SELECT l.recipe_id
+            FROM ({links(
+                'x.{feature} IN (SELECT feature_id FROM source '
+                'WHERE kind = {kind} AND common = 0) AND x.recipe_id <> %s'
+            )}) l
+            JOIN {qn(Recipe._meta.db_table)} r ON r.id = l.recipe_id
+            WHERE r.user_id = %s AND r.deleted_at IS NULL
+            GROUP BY l.recipe_id
+            ORDER BY SUM(l.weight) DESC, l.recipe_id DESC
+            LIMIT {max_candidates}
+        )
+        SELECT recipe_id, shared / NULLIF(
+            (SELECT SUM(weight) FROM source) + total - shared, 0
+        ) AS score
+        FROM (
+            SELECT l.recipe_id,
+                   SUM(l.weight) AS total,
+                   SUM(CASE WHEN f.feature_id IS NULL THEN 0
+                       ELSE l.weight END) AS shared
+            FROM ({links(
+                'x.recipe_id IN (SELECT recipe_id FROM candidates)'
+            )}) l
+            LEFT JOIN source f
+                ON f.kind = l.kind AND f.feature_id = l.feature_id
+            GROUP BY l.recipe_id
+        ) s
+        WHERE shared > 0
+        ORDER BY score DESC, recipe_id DESC
+        LIMIT %s
+    '''
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            sql,
+            [recipe.id] * 4 + [recipe.user_id, int(limit)],
+        )
+        return [(pk, float(score)) for pk, score in cursor.fetchall()]
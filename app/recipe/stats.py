@@ -0,0 +1,108 @@
+"""
+Per-user recipe statistics
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+STATS_FIELDS = [
+    'recipe_count',
+    'price_avg',
+    'price_min',
+    'price_max',
+    'time_minutes_avg',
+    'time_minutes_min',
+    'time_minutes_max',
+    'recipes_without_image',
+]
+
+
+def stats_cache_key(user_id):
+    """ Return the cache key of the statistics of a user. """
+    return f'recipe-stats:{user_id}'
+
+
+def _top_sql(qn, model, through, column, top):
+    """ Return SQL for the most used tags or ingredients of a user. """
+    name = model._meta.model_name
+    # The derived table lets every database take an ORDER BY & LIMIT
+    # inside a UNION. The NULLs stay outside so their type is taken
+    # from the recipe aggregates.
+    return f'''
+        SELECT '{name}', id, name, uses,
+               NULL, NULL, NULL, NULL, NULL, NULL, NULL
+        FROM (
+            SELECT a.id, a.name, COUNT(*) AS uses
+            FROM {qn(model._meta.db_table)} a
+            JOIN {qn(through._meta.db_table)} l ON l.{qn(column)} = a.id
+            JOIN {qn(Recipe._meta.db_table)} r ON r.id = l.recipe_id
+            WHERE a.user_id = %s AND r.deleted_at IS NULL
+            GROUP BY a.id, a.name
+            ORDER BY COUNT(*) DESC, a.id
+            LIMIT {int(top)}
+        ) {qn(name + '_top')}
+    '''
+
+
+def compute_stats(user_id, top=None, using=None):
+    """ Return the recipe statistics of a user, computed in a single
+        query on the database reads are routed to. """
+    top = settings.RECIPE_STATS_TOP if top is None else top
+    using = using or router.db_for_read(Recipe)
+    qn = connections[using].ops.quote_name
+    sql = f'''
+        SELECT 'recipe', NULL, NULL, COUNT(*),
+               AVG(price), MIN(price), MAX(price),
+               AVG(time_minutes), MIN(time_minutes), MAX(time_minutes),
+               SUM(CASE WHEN image IS NULL OR image = '' THEN 1 ELSE 0 END)
+        FROM {qn(Recipe._meta.db_table)}
+        WHERE user_id = %s AND deleted_at IS NULL
+        UNION ALL {_top_sql(qn, Tag, Recipe.tags.through, 'tag_id', top)}
+        UNION ALL {_top_sql(
+            qn, Ingredient, Recipe.ingredients.through, 'ingredient_id', top,
+        )}
+    '''
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [user_id] * 3)
+        rows = cursor.fetchall()
+
+    stats = {'top_tags': [], 'top_ingredients': []}
+    for kind, pk, name, count, *values in rows:
+        if kind == 'recipe':
+            stats.update(zip(STATS_FIELDS, [count, *values]))
+            stats['recipes_without_image'] = values[-1] or 0
+        else:
+            stats[f'top_{kind}s'].append(
+                {'id': pk, 'name': name, 'count': count}
+            )
+    # UNION ALL keeps the order of each part, but sort to be explicit.
+    for key in ['top_tags', 'top_ingredients']:
+        stats[key].sort(key=lambda item: (-item['count'], item['id']))
+    return stats
+
+
+def get_stats(user_id):
+    """ Return the cached recipe statistics of a user. """
+    key = stats_cache_key(user_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_stats(user_id)
+        cache.set(key, stats, settings.RECIPE_STATS_CACHE_SECONDS)
+    return stats
+
+
+def invalidate_stats(sender, instance, **kwargs):
+    """ Drop the cached statistics of the owner of a changed recipe, tag
+        or ingredient. """
+    cache.delete(stats_cache_key(instance.user_id))
+
+
+def invalidate_purged_stats(sender, user_ids, **kwargs):
+    """ Drop the cached statistics of the owners of a purged batch. """
+    cache.delete_many([stats_cache_key(user_id) for user_id in user_ids])
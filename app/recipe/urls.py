@@ -1,6 +1,7 @@
 """
 Mappings for the recipe app
 """
+from django.conf import settings
 from django.urls import (
     path,
     include,
@@ -8,6 +9,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
+from core.async_views import async_read_patterns
 from recipe import views
 
 
@@ -18,6 +20,13 @@ router.register('ingredients', views.IngredientViewSet)
 
 app_name = 'recipe'
 
+router_urls = router.urls
+# When running under ASGI, serve reads from the async wrappers so a
+# request waiting on the database does not hold up the event loop.
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_patterns(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('stats/', views.RecipeStatsView.as_view(), name='stats'),
+    path('', include(router_urls)),
 ]
@@ -1,6 +1,15 @@
 """
 Views for the Recipe APIs
 """
+import mimetypes
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+)
 
 from drf_spectacular.utils import (
     extend_schema_view,
@@ -9,21 +18,73 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 from rest_framework import (
+    generics,
     viewsets,
     mixins,
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import (
+    IsAuthenticated,
+    SAFE_METHODS,
+)
 
+from core.idempotency import idempotent
+from core.purge import soft_delete_recipe
+from core.images import get_or_create_rendition, rendition_storage
+from core.throttling import SlidingWindowThrottle
+from core.routers import (
+    pin_to_primary,
+    read_from,
+    replica_for,
+)
 from core.models import (
     Recipe,
     Tag,
     Ingredient,
 )
 from recipe import serializers
+from recipe.clone import clone_recipe
+from recipe.similar import similar_recipes
+from recipe.stats import get_stats
+from recipe.pagination import KeysetPagination
+
+
+class ReplicaReadMixin:
+    """ Serve safe requests from a read replica and keep the user on the
+        primary for a short while after they write. """
+
+    def dispatch(self, request, *args, **kwargs):
+        # Leave the replica on every way out, unhandled exceptions
+        # included, or later reads on this thread would stay on it.
+        self._read_context = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._read_context:
+                self._read_context.__exit__(None, None, None)
+                self._read_context = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Authentication has run by now, so we know who is asking.
+        if request.method in SAFE_METHODS:
+            alias = replica_for(request.user)
+            if alias:
+                self._read_context = read_from(alias)
+                self._read_context.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and request.user.is_authenticated):
+            pin_to_primary(request.user)
+
+        return super().finalize_response(request, response, *args, **kwargs)
 
 
 @extend_schema_view(
@@ -38,16 +99,52 @@ from recipe import serializers
                 'ingredients',
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
-            )
+            ),
+            OpenApiParameter(
+                'price_min',
+                OpenApiTypes.DECIMAL,
+                description='Only recipes costing at least this much',
+            ),
+            OpenApiParameter(
+                'price_max',
+                OpenApiTypes.DECIMAL,
+                description='Only recipes costing at most this much',
+            ),
+            OpenApiParameter(
+                'time_max',
+                OpenApiTypes.INT,
+                description='Only recipes taking at most these minutes',
+            ),
+            OpenApiParameter(
+                'facets',
+                OpenApiTypes.BOOL,
+                description=(
+                    'Also return how many of the matching recipes have '
+                    'each tag & ingredient.'
+                ),
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                description=(
+                    'Field to order by, prefixed with - for descending. '
+                    'One of: ' + ', '.join(
+                        serializers.RecipeFilterSerializer.ORDERING_FIELDS
+                    )
+                ),
+            ),
         ]
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """ View for manage recipe APIs """
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'recipes'
+    pagination_class = KeysetPagination
 
     def _params_to_ints(self, qs):
         """ Convert a list if strings to integers """
@@ -67,12 +164,70 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredient_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
 
+        # Filters & ordering only apply to the list, so stray query
+        # params on the other actions are ignored rather than rejected.
+        ordering = ['-id']
+        if self.action == 'list':
+            filters = serializers.RecipeFilterSerializer(
+                data=self.request.query_params
+            )
+            filters.is_valid(raise_exception=True)
+            params = filters.validated_data
+            if 'price_min' in params:
+                queryset = queryset.filter(price__gte=params['price_min'])
+            if 'price_max' in params:
+                queryset = queryset.filter(price__lte=params['price_max'])
+            if 'time_max' in params:
+                queryset = queryset.filter(
+                    time_minutes__lte=params['time_max'],
+                )
+            ordering = params['ordering']
+
         # Since multiple values of tags or ingredients, may
         # be in the queryset, we would like to ger
         # a 'unique' list, therefore we call 'distinct()'
+        # Load the nested tags & ingredients in one query each instead
+        # of two more queries for every recipe serialized.
+        # Deleted recipes are hidden until the purge removes them.
         return queryset.filter(
-            user=self.request.user
-        ).order_by('-id').distinct()
+            user=self.request.user,
+            deleted_at__isnull=True,
+        ).order_by(*ordering).distinct().prefetch_related(
+            'tags', 'ingredients',
+        )
+
+    def _facet_counts(self, queryset):
+        """ Return the number of recipes in queryset using each tag and
+            ingredient, with one grouped query for each. """
+        recipe_ids = queryset.order_by().values('id')
+        return {
+            name: serializers.UsageSerializer(
+                model.objects.filter(
+                    recipe__in=recipe_ids,
+                ).annotate(
+                    count=Count('recipe'),
+                ).order_by('-count', 'id'),
+                many=True,
+            ).data
+            for name, model in [('tags', Tag), ('ingredients', Ingredient)]
+        }
+
+    def list(self, request, *args, **kwargs):
+        """ List recipes, with facet counts when asked for. """
+        filters = serializers.RecipeFilterSerializer(
+            data=request.query_params
+        )
+        filters.is_valid(raise_exception=True)
+        response = super().list(request, *args, **kwargs)
+        if not filters.validated_data['facets']:
+            return response
+
+        if not isinstance(response.data, dict):
+            response.data = {'results': response.data}
+        response.data['facets'] = self._facet_counts(
+            self.filter_queryset(self.get_queryset())
+        )
+        return response
 
     def get_serializer_class(self):
         """ Return the serializer class for the 'list' request """
@@ -92,19 +247,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # ModelViewSet. We need to define it ourselves, in this class
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarRecipeSerializer
 
         return self.serializer_class
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """ Create a recipe, once per Idempotency-Key. """
+        return super().create(request, *args, **kwargs)
+
+    # partial_update calls update, so this covers PATCH as well.
+    @idempotent
+    def update(self, request, *args, **kwargs):
+        """ Update a recipe, once per Idempotency-Key. """
+        return super().update(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """ Create a new recipe. """
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """ Mark the recipe deleted, the purge removes it later. """
+        soft_delete_recipe(instance)
+
     # In this method/acton, we are only accepting 'POST'
     # detail=True ==> this action applies only to the deail
     #                 portion of our ModelViewSet. 'detail'
     #                 refers to a recipe with a specific id
     # The custom url path = 'upload-image'
     @action(methods=['POST'], detail=True, url_path='upload-image')
+    @idempotent
     def upload_image(self, request, pk=None):
         """ Upload an image to recipe. """
         recipe = self.get_object()
@@ -116,6 +289,133 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(request=None, responses=serializers.RecipeDetailSerializer)
+    @action(methods=['POST'], detail=True)
+    def clone(self, request, pk=None):
+        """ Copy a recipe with its tags, ingredients & image. """
+        recipe = get_object_or_404(
+            self.get_queryset().prefetch_related(None), pk=pk,
+        )
+        self.check_object_permissions(request, recipe)
+        clone = clone_recipe(recipe)
+
+        clone = Recipe.objects.prefetch_related(
+            'tags', 'ingredients',
+        ).get(pk=clone.pk)
+        serializer = serializers.RecipeDetailSerializer(clone)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'recipes',
+                OpenApiTypes.STR,
+                required=True,
+                description='Comma separated list of recipe IDs',
+            )
+        ],
+        responses=serializers.UsageSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=False, url_path='shopping-list')
+    def shopping_list(self, request):
+        """ List the ingredients of the given recipes once each, with the
+            number of those recipes using them. """
+        try:
+            recipe_ids = self._params_to_ints(
+                request.query_params.get('recipes', '')
+            )
+        except ValueError:
+            raise ValidationError(
+                {'recipes': 'A comma separated list of IDs is required.'}
+            )
+
+        ingredients = Ingredient.objects.filter(
+            recipe__id__in=recipe_ids,
+            recipe__user=request.user,
+            recipe__deleted_at__isnull=True,
+        ).annotate(
+            count=Count('recipe'),
+        ).order_by('name', 'id')
+        serializer = serializers.UsageSerializer(ingredients, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Number of recipes to return, at most 100',
+            )
+        ],
+    )
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """ List the user's recipes sharing the most tags & ingredients with
+            this one. """
+        # Only the id & owner are needed, so skip loading the relations.
+        recipe = get_object_or_404(
+            self.get_queryset().prefetch_related(None), pk=pk,
+        )
+        self.check_object_permissions(request, recipe)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        scores = dict(similar_recipes(recipe, min(max(limit, 1), 100)))
+
+        recipes = Recipe.objects.filter(
+            id__in=scores,
+        ).prefetch_related('tags', 'ingredients')
+        for other in recipes:
+            other.similarity = scores[other.id]
+        recipes = sorted(
+            recipes, key=lambda r: (-r.similarity, -r.id),
+        )
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'width',
+                OpenApiTypes.INT,
+                OpenApiParameter.PATH,
+                enum=settings.RECIPE_IMAGE_WIDTHS,
+                description='Width of the resized image in pixels',
+            )
+        ],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(
+        methods=['GET'],
+        detail=True,
+        url_path=r'image/(?P<width>[0-9]+)',
+        url_name='image-rendition',
+    )
+    def image_rendition(self, request, pk=None, width=None):
+        """ Return the recipe image resized to one of the allowed widths. """
+        recipe = self.get_object()
+        width = int(width)
+        if not recipe.image or width not in settings.RECIPE_IMAGE_WIDTHS:
+            raise Http404
+
+        relative_path = get_or_create_rendition(recipe.image, width)
+        content_type, _ = mimetypes.guess_type(relative_path)
+
+        # Behind nginx, only tell the proxy which file to send so the
+        # worker is free as soon as the headers are written.
+        if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = (
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + relative_path
+            )
+            return response
+
+        return FileResponse(
+            rendition_storage.open(relative_path),
+            content_type=content_type,
+        )
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -128,13 +428,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,  # To del. an ingredient
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            mixins.DestroyModelMixin,  # To del. an ingredient
                             mixins.UpdateModelMixin,   # To upd. an ingredient
                             mixins.ListModelMixin,     # To list ingredients
                             viewsets.GenericViewSet):
     """ Base viewset for recipe attributes """
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_classes = [SlidingWindowThrottle]
 
     def get_queryset(self):
         """ Filter queryset to authenticated user """
@@ -143,7 +445,10 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,  # To del. an ingredient
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(
+                recipe__isnull=False,
+                recipe__deleted_at__isnull=True,
+            )
 
         return queryset.filter(
             user=self.request.user
@@ -154,9 +459,26 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """ Manage Tags in the Database """
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
+    throttle_scope = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """ Manage ingredients in the database. """
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+    throttle_scope = 'ingredients'
+
+
+class RecipeStatsView(ReplicaReadMixin, generics.GenericAPIView):
+    """ Summarize the recipes of the authenticated user. """
+    serializer_class = serializers.RecipeStatsSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'recipes'
+
+    def get(self, request):
+        """ Return the cached statistics, computed in one query on a miss.
+        """
+        serializer = self.get_serializer(get_stats(request.user.id))
+        return Response(serializer.data)
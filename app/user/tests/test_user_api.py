@@ -1,6 +1,7 @@
 """
 tests for user API
 """
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -8,6 +9,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.testing import QueryBudgetMixin
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -39,6 +42,43 @@ class PublicUserApiTests(TestCase):
         self.assertTrue(user.check_password(payload['password']))
         self.assertNotIn('password', res.data)
 
+    def test_create_user_retry_replayed(self):
+        """ Test a retry with the same Idempotency-Key replays the response
+        """
+        cache.clear()
+        payload = {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+            'name': 'Test Name',
+        }
+        first = self.client.post(
+            CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY='abc',
+        )
+        retry = self.client.post(
+            CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY='abc',
+        )
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_create_user_key_scoped_by_body(self):
+        """ Test anonymous callers reusing a key do not get each other's
+            responses """
+        cache.clear()
+        for email in ['one@example.com', 'two@example.com']:
+            res = self.client.post(CREATE_USER_URL, {
+                'email': email,
+                'password': 'testpass123',
+                'name': 'Test Name',
+            }, HTTP_IDEMPOTENCY_KEY='abc')
+
+            self.assertEqual(res.data['email'], email)
+            self.assertFalse(res.has_header('Idempotent-Replayed'))
+
+        self.assertEqual(get_user_model().objects.count(), 2)
+
     def test_user_with_email_exists_error(self):
         """ Test error returned if user with email exists. """
         payload = {
@@ -109,7 +149,7 @@ class PublicUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateUserApiTest(TestCase):
+class PrivateUserApiTest(QueryBudgetMixin, TestCase):
     """ Test API requests that require authentication. """
 
     def setUp(self):
@@ -147,3 +187,10 @@ class PrivateUserApiTest(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_profile_query_budget(self):
+        """ Test retrieving the profile needs no queries. """
+        with self.assertQueryBudget(max_queries=0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -5,6 +5,8 @@ from rest_framework import generics, authentication, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.idempotency import idempotent
+from core.throttling import SlidingWindowThrottle
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
@@ -14,12 +16,21 @@ from user.serializers import (
 class CreateUserView(generics.CreateAPIView):
     """ Create a new user in the system """
     serializer_class = UserSerializer
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'users'
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        """ Create a user, once per Idempotency-Key. """
+        return super().post(request, *args, **kwargs)
 
 
 class CreateTokenView(ObtainAuthToken):
     """ Create a new auth token for user. """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'token'
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
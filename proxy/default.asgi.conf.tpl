@@ -0,0 +1,32 @@
+server {
+    listen ${LISTEN_PORT};
+
+    location /static {
+        alias /vol/static;
+    }
+
+    # Media files handed over by the app with X-Accel-Redirect.
+    location /internal/media/ {
+        internal;
+        alias /vol/static/media/;
+    }
+
+    # Metrics are only for the scraper on the private network.
+    location /metrics {
+        allow 10.0.0.0/8;
+        allow 172.16.0.0/12;
+        allow 192.168.0.0/16;
+        deny all;
+        proxy_pass           http://${APP_HOST}:${APP_PORT};
+        proxy_set_header     Host $host;
+    }
+
+    location / {
+        proxy_pass           http://${APP_HOST}:${APP_PORT};
+        proxy_http_version   1.1;
+        proxy_set_header     Host $host;
+        proxy_set_header     X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header     X-Forwarded-Proto $scheme;
+        client_max_body_size 10M;
+    }
+}
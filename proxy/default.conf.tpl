@@ -5,9 +5,27 @@ server {
         alias /vol/static;
     }
 
+    # Media files handed over by the app with X-Accel-Redirect.
+    location /internal/media/ {
+        internal;
+        alias /vol/static/media/;
+    }
+
+    # Metrics are only for the scraper on the private network.
+    location /metrics {
+        allow 10.0.0.0/8;
+        allow 172.16.0.0/12;
+        allow 192.168.0.0/16;
+        deny all;
+        uwsgi_pass     ${APP_HOST}:${APP_PORT};
+        include        /etc/nginx/uwsgi_params;
+        uwsgi_param    HTTP_X_FORWARDED_FOR $proxy_add_x_forwarded_for;
+    }
+
     location / {
         uwsgi_pass     ${APP_HOST}:${APP_PORT};
         include        /etc/nginx/uwsgi_params;
+        uwsgi_param    HTTP_X_FORWARDED_FOR $proxy_add_x_forwarded_for;
         client_max_body_size 10M;
     }
 }
\ No newline at end of file
@@ -0,0 +1,37 @@
+#!/bin/sh
+#
+# Compare the WSGI & ASGI deployments against a slow database.
+#
+# Starts the deploy stack once per mode, in its own compose project so
+# no real data is touched, with DB_SIMULATED_LATENCY_MS (default 50)
+# added to every query. Then benchmarks it through the proxy and writes
+# loadtest/wsgi.json & loadtest/asgi.json. Extra arguments are passed on
+# to manage.py benchmark, for example:
+#
+#   scripts/loadtest.sh --concurrency 64 --scenario recipe-list
+
+set -e
+
+COMPOSE="docker-compose -p recipe-loadtest -f docker-compose-deploy.yml \
+    -f docker-compose-loadtest.yml"
+mkdir -p loadtest
+
+for mode in wsgi asgi; do
+    if [ "$mode" = "asgi" ]; then
+        export ASGI=1
+    else
+        export ASGI=0
+    fi
+    $COMPOSE up -d --build
+    until $COMPOSE exec -T app python -c \
+        "import urllib.request; urllib.request.urlopen('http://proxy:8000/healthz')" \
+        2>/dev/null; do
+        sleep 2
+    done
+
+    echo "== $mode"
+    $COMPOSE exec -T app python manage.py benchmark \
+        --url http://proxy:8000 --output /tmp/loadtest.json "$@"
+    $COMPOSE exec -T app cat /tmp/loadtest.json > "loadtest/$mode.json"
+    $COMPOSE down -v
+done
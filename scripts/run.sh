@@ -6,4 +6,30 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+# Build the API schema once, before any worker starts serving it.
+export SPECTACULAR_SCHEMA_FILE=/vol/web/schema.json
+python manage.py spectacular --format openapi-json --file $SPECTACULAR_SCHEMA_FILE
+
+# Workers share their metrics through files in this directory, which
+# must start out empty.
+export PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus
+rm -rf $PROMETHEUS_MULTIPROC_DIR
+mkdir -p $PROMETHEUS_MULTIPROC_DIR
+
+if [ "$STARTUP_PROFILE" = "1" ]; then
+    python manage.py import_times
+fi
+
+# Both servers import the app in the master process and fork workers
+# from it, so the warmup in app/wsgi.py & app/asgi.py is shared.
+if [ "$ASGI" = "1" ]; then
+    export ASYNC_READ_VIEWS=1
+    gunicorn app.asgi:application \
+        --config gunicorn.conf.py \
+        --bind :9000 \
+        --workers 4 \
+        --preload \
+        --worker-class uvicorn.workers.UvicornWorker
+else
+    uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+fi